@@ -0,0 +1,317 @@
+"""
+Headless arena: pits two agents against each other for many games and reports how they did.
+
+An agent is any object with choose_move(game) -> (row, col), like
+TicTacToeMoves.generate_random_move; make_agent builds the ones in this repo (random moves,
+a Policy compiled from model stats, the perfect solver, MCTS and a Q-table). Games are
+played on bitboard.BitboardTicTacToe without any display, by a pool of worker processes.
+The two agents swap sides every game, so each plays X in half of them.
+
+The driver splits the games into fixed-size tasks, like training.py. Every task reseeds the
+agents' random generators from (seed, task index), so the results do not depend on the
+worker count. Expensive setup (solving, compiling a policy) happens once, in the driver,
+and the workers inherit the prepared agents.
+
+run_arena returns agent A's wins, draws and losses with Wilson score intervals for each
+rate, games/sec, and the latency percentiles of every agent's choose_move. To gate a model
+promotion, compare the candidate (A) with the current model (B) and require the lower bound
+of the win rate (or the upper bound of the loss rate) to clear a threshold.
+"""
+
+import math
+import multiprocessing as mp
+import random
+import time
+import numpy as np
+from config import (
+    TIC_TAC_TOE_SIZE,
+    PLAYER_X,
+    PLAYER_O,
+    GAME_WINNER_DRAW,
+    BOARD_INDEX_REACHABLE,
+    ARENA_NUM_WORKERS,
+    ARENA_GAMES_PER_TASK,
+    ARENA_CONFIDENCE_Z,
+)
+from bitboard import BitboardTicTacToe
+from process_pool import pool_context
+
+AGENT_RANDOM = "random"
+AGENT_POLICY = "policy"
+AGENT_SOLVER = "solver"
+AGENT_MCTS = "mcts"
+AGENT_QLEARNING = "qlearning"
+AGENT_KINDS = (AGENT_RANDOM, AGENT_POLICY, AGENT_SOLVER, AGENT_MCTS, AGENT_QLEARNING)
+
+# per-move latency percentiles in the report
+LATENCY_PERCENTILES = (50, 90, 99)
+
+# the two agents and the game settings of a worker; set once per process by _init_worker
+_worker_agents = None
+_worker_size = None
+_worker_win_length = None
+
+
+class RandomAgent:
+    """Uniformly random legal moves, like TicTacToeMoves.generate_random_move but seedable."""
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def choose_move(self, game):
+        linear_pos = self.rng.choice(game.open_positions)
+        return (linear_pos // game.size, linear_pos % game.size)
+
+
+def make_agent(kind, model=None, seed=None, **options):
+    """
+    Build an agent of one of the AGENT_KINDS.
+
+    Args:
+        kind: AGENT_RANDOM, AGENT_POLICY, AGENT_SOLVER, AGENT_MCTS or AGENT_QLEARNING
+        model: TicTacToeModel for the model-based agents (required for AGENT_POLICY and
+            AGENT_QLEARNING; the solver builds a reachable-index model when it is None;
+            MCTS uses it for priors)
+        seed: seed for the agent's random choices
+        options: passed on to the agent's constructor (e.g. mode for Policy, rollouts for
+            MCTSAgent); AGENT_QLEARNING takes path, the Q-table file to load
+    Returns:
+        the agent
+    """
+    if kind == AGENT_RANDOM:
+        return RandomAgent(seed)
+    if kind == AGENT_MCTS:
+        from mcts import MCTSAgent
+
+        return MCTSAgent(model=model, seed=seed, **options)
+    if kind == AGENT_SOLVER:
+        from model import TicTacToeModel
+        from retrograde import RetrogradeSolver
+
+        if model is None:
+            model = TicTacToeModel(board_index_mode=BOARD_INDEX_REACHABLE)
+        return RetrogradeSolver(model, seed=seed, **options)
+    if kind not in AGENT_KINDS:
+        raise ValueError(f"Invalid agent kind: {kind}. Expected one of {AGENT_KINDS}")
+    if model is None:
+        raise ValueError(f"A {kind} agent needs a model")
+    if kind == AGENT_POLICY:
+        from policy import Policy
+
+        return Policy(model, seed=seed, **options)
+    from qlearning import QLearner
+
+    path = options.pop("path", None)
+    learner = QLearner(model, seed=seed, **options)
+    if path is not None:
+        learner.load(path)
+    return learner
+
+
+def wilson_interval(successes, trials, z=ARENA_CONFIDENCE_Z):
+    """
+    Wilson score interval of a binomial rate; unlike the normal approximation it stays
+    inside [0, 1] and is usable at rates of 0 or 1 (a solver that never loses).
+
+    Args:
+        successes: number of successes
+        trials: number of trials
+        z: standard normal quantile of the confidence level (1.96 = 95%)
+    Returns:
+        (low, high); (0.0, 1.0) when there are no trials
+    """
+    if trials == 0:
+        return (0.0, 1.0)
+    rate = successes / trials
+    denominator = 1 + z * z / trials
+    center = (rate + z * z / (2 * trials)) / denominator
+    margin = (
+        z * math.sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials))
+    ) / denominator
+    return (max(0.0, center - margin), min(1.0, center + margin))
+
+
+def _init_worker(agents, size, win_length):
+    global _worker_agents, _worker_size, _worker_win_length
+    _worker_agents = agents
+    _worker_size = size
+    _worker_win_length = win_length
+
+
+def _seed_agent(agent, seed_sequence):
+    """Reseed the agent's random generator (the `rng` attribute), whatever its kind."""
+    rng = getattr(agent, "rng", None)
+    if isinstance(rng, random.Random):
+        rng.seed(int(seed_sequence.generate_state(1, dtype=np.uint64)[0]))
+    elif isinstance(rng, np.random.Generator):
+        agent.rng = np.random.default_rng(seed_sequence)
+
+
+def _play_task(task):
+    """
+    Play one task's games. Agent A plays X in the games with an even number.
+
+    Args:
+        task: (task_index, first_game, num_games, seed)
+    Returns:
+        (task_index, outcomes, latencies): outcomes is an int8 array with one entry per game
+        (1 = A won, 0 = draw, -1 = A lost), latencies holds two int64 arrays with the
+        choose_move times of A and B in nanoseconds
+    """
+    task_index, first_game, num_games, seed = task
+    agents = _worker_agents
+    for agent, seed_sequence in zip(
+        agents, np.random.SeedSequence([seed, task_index]).spawn(2)
+    ):
+        _seed_agent(agent, seed_sequence)
+    outcomes = np.zeros(num_games, dtype=np.int8)
+    latencies = ([], [])
+    for game_index in range(num_games):
+        a_side = PLAYER_X if (first_game + game_index) % 2 == 0 else PLAYER_O
+        game = BitboardTicTacToe(_worker_size, win_length=_worker_win_length)
+        for agent in agents:
+            # a game starts from the empty board: drop any tree kept from the last game
+            if hasattr(agent, "reset"):
+                agent.reset()
+        while not game.is_game_over:
+            mover = 0 if game.next_player == a_side else 1
+            start = time.perf_counter_ns()
+            row, col = agents[mover].choose_move(game)
+            latencies[mover].append(time.perf_counter_ns() - start)
+            game.make_move(row, col)
+        if game.winner != GAME_WINNER_DRAW:
+            outcomes[game_index] = 1 if game.winner == a_side else -1
+    return (
+        task_index,
+        outcomes,
+        tuple(np.array(times, dtype=np.int64) for times in latencies),
+    )
+
+
+def _latency_summary(times_ns):
+    """choose_move latency percentiles in microseconds, plus the move count."""
+    summary = {"moves": len(times_ns)}
+    for percentile in LATENCY_PERCENTILES:
+        summary[f"p{percentile}_us"] = (
+            float(np.percentile(times_ns, percentile)) / 1000 if len(times_ns) else 0.0
+        )
+    return summary
+
+
+def run_arena(
+    agent_a,
+    agent_b,
+    num_games,
+    num_workers=ARENA_NUM_WORKERS,
+    games_per_task=ARENA_GAMES_PER_TASK,
+    seed=0,
+    size=TIC_TAC_TOE_SIZE,
+    win_length=None,
+    z=ARENA_CONFIDENCE_Z,
+):
+    """
+    Play agent A against agent B and report A's results.
+
+    Args:
+        agent_a: agent under evaluation (anything with choose_move(game))
+        agent_b: its opponent
+        num_games: games to play; A plays X in the even-numbered ones
+        num_workers: worker processes (None = one per CPU core, 1 = run in this process)
+        games_per_task: games per task (the unit of work and of seeding)
+        seed: base seed; the agents are reseeded with (seed, i) for task i
+        size: board size
+        win_length: pieces in a row needed to win (see board_geometry.win_lines)
+        z: standard normal quantile of the confidence intervals
+    Returns:
+        dictionary with:
+        - "games", "wins", "draws", "losses": counts from A's point of view
+        - "win_rate", "draw_rate", "loss_rate" and the matching "*_interval" (low, high)
+        - "as_x" and "as_o": A's (wins, draws, losses) with each side
+        - "seconds", "games_per_sec"
+        - "latency": {"a": ..., "b": ...}, each with "moves" and the choose_move latency
+          percentiles "p50_us", "p90_us", "p99_us" in microseconds
+    """
+    if num_workers is None:
+        num_workers = mp.cpu_count()
+
+    tasks = []
+    first_game = 0
+    while first_game < num_games:
+        task_games = min(games_per_task, num_games - first_game)
+        tasks.append((len(tasks), first_game, task_games, seed))
+        first_game += task_games
+
+    start = time.perf_counter()
+    initargs = ((agent_a, agent_b), size, win_length)
+    if num_workers <= 1:
+        _init_worker(*initargs)
+        results = list(map(_play_task, tasks))
+    else:
+        # fork shares the prepared agents with the workers without pickling them
+        with pool_context().Pool(
+            num_workers, initializer=_init_worker, initargs=initargs
+        ) as pool:
+            results = list(pool.imap_unordered(_play_task, tasks))
+    seconds = time.perf_counter() - start
+
+    results.sort(key=lambda result: result[0])
+    outcomes = np.concatenate([result[1] for result in results] or [[]])
+    a_is_x = np.arange(len(outcomes)) % 2 == 0
+    report = {"games": len(outcomes)}
+    for name, rate_name, outcome in (
+        ("wins", "win", 1),
+        ("draws", "draw", 0),
+        ("losses", "loss", -1),
+    ):
+        count = int(np.count_nonzero(outcomes == outcome))
+        report[name] = count
+        report[f"{rate_name}_rate"] = count / len(outcomes) if len(outcomes) else 0.0
+        report[f"{rate_name}_interval"] = wilson_interval(count, len(outcomes), z)
+    for side, mask in (("as_x", a_is_x), ("as_o", ~a_is_x)):
+        report[side] = tuple(
+            int(np.count_nonzero(outcomes[mask] == outcome)) for outcome in (1, 0, -1)
+        )
+    report["seconds"] = seconds
+    report["games_per_sec"] = len(outcomes) / seconds if seconds > 0 else float("inf")
+    report["latency"] = {
+        name: _latency_summary(
+            np.concatenate([result[2][player] for result in results] or [[]])
+        )
+        for player, name in enumerate(("a", "b"))
+    }
+    return report
+
+
+def format_report(report, name_a="A", name_b="B"):
+    """One-paragraph text summary of a run_arena report."""
+    lines = [
+        f"{name_a} vs {name_b}: {report['games']} games in {report['seconds']:.2f}s "
+        f"({report['games_per_sec']:,.0f} games/sec)"
+    ]
+    for rate_name in ("win", "draw", "loss"):
+        low, high = report[f"{rate_name}_interval"]
+        lines.append(
+            f"  {rate_name:>4}: {report[f'{rate_name}_rate']:7.2%} "
+            f"[{low:7.2%}, {high:7.2%}]"
+        )
+    lines.append(f"  {name_a} as X (W/D/L): {report['as_x']}, as O: {report['as_o']}")
+    for name, key in ((name_a, "a"), (name_b, "b")):
+        latency = report["latency"][key]
+        percentiles = ", ".join(
+            f"p{percentile} {latency[f'p{percentile}_us']:,.1f}us"
+            for percentile in LATENCY_PERCENTILES
+        )
+        lines.append(f"  {name} move latency: {percentiles} ({latency['moves']} moves)")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from model import TicTacToeModel
+
+    model = TicTacToeModel(board_index_mode=BOARD_INDEX_REACHABLE)
+    solver = make_agent(AGENT_SOLVER, model)
+    random_agent = make_agent(AGENT_RANDOM)
+    mcts_agent = make_agent(AGENT_MCTS, rollouts=200)
+    print(format_report(run_arena(solver, random_agent, 10_000), "solver", "random"))
+    print(format_report(run_arena(mcts_agent, random_agent, 1_000), "mcts", "random"))
+    print(format_report(run_arena(mcts_agent, solver, 200), "mcts", "solver"))
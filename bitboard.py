@@ -0,0 +1,208 @@
+# This is a bitboard Tic-Tac-Toe environment class.
+# It exposes the same surface as t3.TicTacToe (make_move, winner, is_game_over, next_player,
+# move_count, board, open_positions) so it can be swapped in wherever a game object is used,
+# but the board is stored as two integer bit masks, one per player:
+# bit k of x_mask is set when X owns cell k (cells are numbered row-major).
+# Like t3.TicTacToe it also keeps the base-3 board_code and the Zobrist hash up to date.
+
+from functools import lru_cache
+from t3 import (
+    WrongMoveError,
+    STRING_X,
+    STRING_O,
+    STRING_EMPTY,
+    STRING_DELIMITER,
+    STRING_WINNER_DRAW,
+    TIC_TAC_TOE_SIZE,
+)
+from board_geometry import win_lines, code_weights, CODE_EMPTY, CELL_CODES
+from zobrist import zobrist_keys, zobrist_side_key
+
+
+@lru_cache(maxsize=None)
+def line_masks(size=TIC_TAC_TOE_SIZE, win_length=None):
+    """
+    Bit mask of every winning line (see board_geometry.win_lines).
+    """
+    return tuple(
+        sum(1 << cell for cell in line) for line in win_lines(size, win_length)
+    )
+
+
+@lru_cache(maxsize=None)
+def cell_line_masks(size=TIC_TAC_TOE_SIZE, win_length=None):
+    """
+    For every cell, the masks of the winning lines that pass through it.
+    Only these lines can be completed by a move on that cell.
+    """
+    masks = line_masks(size, win_length)
+    return tuple(
+        tuple(mask for mask in masks if mask >> cell & 1) for cell in range(size * size)
+    )
+
+
+class BitboardTicTacToe:
+    def __init__(self, size=TIC_TAC_TOE_SIZE, code2id=None, win_length=None):
+        """
+        Args:
+            size: board size
+            code2id: optional TicTacToeModel.code2id; when given, board_id and history use
+                the model's board ids instead of raw base-3 codes (they differ in
+                reachable mode)
+            win_length: pieces in a row needed to win (see board_geometry.win_lines)
+        """
+        # board size:
+        self.size = size
+        self.num_cells = size * size
+        # one bit per cell for each player
+        self.x_mask = 0
+        self.o_mask = 0
+        self.full_mask = (1 << self.num_cells) - 1
+        self.cell_lines = cell_line_masks(size, win_length)
+        # next player:
+        self.next_player = STRING_X
+        # winner: None (game not over), STRING_X, STRING_O or STRING_WINNER_DRAW
+        self.winner = None
+        # is game over:
+        self.is_game_over = False
+        # move count:
+        self.move_count = 0
+        # base-3 board code, maintained incrementally in the same order that
+        # TicTacToeModel.buildBoardStringIdMappings enumerates boards (all cells empty here)
+        self.code_weights = code_weights(size)
+        self.board_code = 3**self.num_cells - 1
+        self.code2id = code2id
+        # Zobrist hash of the position (see zobrist.py), updated with two XORs per move
+        self.zobrist_keys = zobrist_keys(size)
+        self.zobrist_side_key = zobrist_side_key(size)
+        self.zobrist_hash = 0
+        # (board_id, move, who_moved) for every move so far, ready for
+        # TicTacToeModel.setMoveStatsForEntireGameFromHistory; also the undo stack of
+        # unmake_move
+        self.history = []
+
+    @property
+    def board_id(self):
+        """Model board id of the current position: a direct array index, no strings built."""
+        if self.code2id is None:
+            return self.board_code
+        return int(self.code2id[self.board_code])
+
+    @property
+    def board(self):
+        """The board as a 2D list of strings, like t3.TicTacToe.board (built on demand)."""
+        rows = []
+        for row in range(self.size):
+            cells = []
+            for col in range(self.size):
+                bit = 1 << (row * self.size + col)
+                if self.x_mask & bit:
+                    cells.append(STRING_X)
+                elif self.o_mask & bit:
+                    cells.append(STRING_O)
+                else:
+                    cells.append(STRING_EMPTY)
+            rows.append(cells)
+        return rows
+
+    def legal_moves_mask(self):
+        """Bit mask of the empty cells (the complement of both players' masks)."""
+        return self.full_mask & ~(self.x_mask | self.o_mask)
+
+    @property
+    def open_positions(self):
+        """Linear indices of the empty cells, in ascending order."""
+        free = self.legal_moves_mask()
+        positions = []
+        while free:
+            low_bit = free & -free
+            positions.append(low_bit.bit_length() - 1)
+            free ^= low_bit
+        return positions
+
+    # print the board to the console:
+    def print_board(self):
+        for row in self.board:
+            print(STRING_DELIMITER.join(row))
+        print()
+
+    # make a move on the board:
+    # return the winner of the game or None if the game is not over
+    def make_move(self, row, col, whose_turn=None):
+        if not (0 <= row < self.size and 0 <= col < self.size):
+            raise WrongMoveError(f"Position out of range: ({row},{col})")
+        return self.make_move_at(row * self.size + col, whose_turn)
+
+    def make_move_at(self, position, whose_turn=None):
+        """Same as make_move, but takes the linear cell index (row * size + col)."""
+        bit = 1 << position
+        if (self.x_mask | self.o_mask) & bit:
+            raise WrongMoveError("Cell already taken")  # custom error class
+        if self.is_game_over:
+            raise WrongMoveError("Game is already over")
+
+        # it is the turn of self.next_player
+        if whose_turn is not None and whose_turn != self.next_player:
+            raise WrongMoveError(
+                f"Turn mismatch. Expected: {self.next_player}, but got: {whose_turn}"
+            )
+
+        self.history.append((self.board_id, position, self.next_player))
+        # the cell goes from empty to the player's code
+        self.board_code -= (CODE_EMPTY - CELL_CODES[self.next_player]) * (
+            self.code_weights[position]
+        )
+        self.zobrist_hash ^= (
+            self.zobrist_keys[position][CELL_CODES[self.next_player]]
+            ^ self.zobrist_side_key
+        )
+
+        if self.next_player == STRING_X:
+            self.x_mask |= bit
+            player_mask = self.x_mask
+        else:
+            self.o_mask |= bit
+            player_mask = self.o_mask
+        self.move_count += 1
+
+        # only the lines through the played cell can have been completed
+        for line in self.cell_lines[position]:
+            if player_mask & line == line:
+                self.winner = self.next_player
+                break
+        else:
+            if self.move_count == self.num_cells:
+                self.winner = STRING_WINNER_DRAW
+        self.is_game_over = self.winner is not None
+
+        # move the turn to the next player
+        self.next_player = STRING_O if self.next_player == STRING_X else STRING_X
+        return self.winner
+
+    def unmake_move(self):
+        """
+        Take back the last move in O(1), restoring every attribute make_move changed.
+        No move is accepted after the game is over, so the game was still open before it.
+
+        Returns:
+            the (row, col) of the move that was undone
+        """
+        if not self.history:
+            raise WrongMoveError("No move to undo")
+        _, position, player = self.history.pop()
+        bit = 1 << position
+        if player == STRING_X:
+            self.x_mask &= ~bit
+        else:
+            self.o_mask &= ~bit
+        self.board_code += (CODE_EMPTY - CELL_CODES[player]) * (
+            self.code_weights[position]
+        )
+        self.zobrist_hash ^= (
+            self.zobrist_keys[position][CELL_CODES[player]] ^ self.zobrist_side_key
+        )
+        self.move_count -= 1
+        self.next_player = player
+        self.winner = None
+        self.is_game_over = False
+        return divmod(position, self.size)
@@ -0,0 +1,117 @@
+"""
+Board geometry shared by the game engines and the model.
+Cell codes, base-3 board codes and win lines all live here so every module agrees on them.
+"""
+
+from functools import lru_cache
+import numpy as np
+from config import PLAYER_X, PLAYER_O, EMPTY_CELL, TIC_TAC_TOE_SIZE, WIN_LENGTH
+
+# Numeric cell codes. The order matches the order the model enumerates boards in
+# (TicTacToeModel.CELL_COMBINATIONS), so the base-3 code of a board is its index
+# in the full enumeration.
+CODE_X = 0
+CODE_O = 1
+CODE_EMPTY = 2
+CELL_CODES = {PLAYER_X: CODE_X, PLAYER_O: CODE_O, EMPTY_CELL: CODE_EMPTY}
+CELL_SYMBOLS = (PLAYER_X, PLAYER_O, EMPTY_CELL)
+
+
+@lru_cache(maxsize=None)
+def code_weights(size=TIC_TAC_TOE_SIZE):
+    """
+    Base-3 place value of every cell, row-major. Cell 0 is the most significant digit.
+
+    Returns:
+        tuple of ints, one per cell
+    """
+    cells = size * size
+    return tuple(3 ** (cells - 1 - k) for k in range(cells))
+
+
+def board_string_to_code(board_string, size=TIC_TAC_TOE_SIZE):
+    """
+    Base-3 code of a board string (its index in the full enumeration of boards).
+    """
+    weights = code_weights(size)
+    return sum(CELL_CODES[c] * w for c, w in zip(board_string, weights))
+
+
+def move_dtype(size=TIC_TAC_TOE_SIZE):
+    """Smallest signed integer dtype that holds every cell index (and -1) of the board."""
+    return np.int8 if size * size <= np.iinfo(np.int8).max else np.int16
+
+
+def resolve_win_length(size=TIC_TAC_TOE_SIZE, win_length=None):
+    """
+    Number of pieces in a row needed to win: win_length, else WIN_LENGTH from config,
+    else the full board width.
+    """
+    if win_length is None:
+        win_length = WIN_LENGTH if WIN_LENGTH is not None else size
+    if not 1 <= win_length <= size:
+        raise ValueError(
+            f"Invalid win_length: {win_length}. Expected 1 to {size} on a {size}x{size} board"
+        )
+    return win_length
+
+
+@lru_cache(maxsize=None)
+def win_lines(size=TIC_TAC_TOE_SIZE, win_length=None):
+    """
+    All winning lines of the board as tuples of cell indices: every horizontal, vertical,
+    diagonal and anti-diagonal run of win_length cells (see resolve_win_length).
+    With the default full-width rule these are the rows, the columns and the two diagonals.
+    """
+    k = resolve_win_length(size, win_length)
+    starts = range(size - k + 1)
+    lines = []
+    for row in range(size):
+        for col in starts:
+            lines.append(tuple(row * size + col + i for i in range(k)))
+    for col in range(size):
+        for row in starts:
+            lines.append(tuple((row + i) * size + col for i in range(k)))
+    for row in starts:
+        for col in starts:
+            lines.append(tuple((row + i) * size + col + i for i in range(k)))
+    for row in starts:
+        for col in range(k - 1, size):
+            lines.append(tuple((row + i) * size + col - i for i in range(k)))
+    return tuple(lines)
+
+
+def winner_of_board_string(board_string, size=TIC_TAC_TOE_SIZE, win_length=None):
+    """
+    Return PLAYER_X or PLAYER_O if that player owns a complete line, otherwise None.
+    """
+    for line in win_lines(size, win_length):
+        first = board_string[line[0]]
+        if first != EMPTY_CELL and all(board_string[i] == first for i in line):
+            return first
+    return None
+
+
+@lru_cache(maxsize=None)
+def cell_lines(size=TIC_TAC_TOE_SIZE, win_length=None):
+    """
+    For every cell, the winning lines that pass through it.
+    Only these lines can be completed by a move on that cell.
+    """
+    lines = win_lines(size, win_length)
+    return tuple(
+        tuple(line for line in lines if cell in line) for cell in range(size * size)
+    )
+
+
+@lru_cache(maxsize=None)
+def cell_line_indices(size=TIC_TAC_TOE_SIZE, win_length=None):
+    """
+    Like cell_lines, but as positions in win_lines(size, win_length), for per-line
+    counters indexed by line.
+    """
+    lines = win_lines(size, win_length)
+    return tuple(
+        tuple(index for index, line in enumerate(lines) if cell in line)
+        for cell in range(size * size)
+    )
@@ -0,0 +1,303 @@
+"""
+Binary checkpoints for TicTacToeModel (and other per-board arrays).
+
+File layout:
+- header (64 bytes): magic, format version, board index version, board size, win length,
+  kind, board index mode, symmetry flag, number of arrays
+- array directory: name, dtype, shape and file offset of every array
+- raw array data, each array starting on a 64-byte boundary
+
+Because the arrays are stored raw, loading maps them straight from the file with np.memmap:
+a serving process starts without reading or parsing the stats, and processes that load the
+same checkpoint share its pages through the OS page cache.
+
+Files are always written to a temporary file in the same directory and then renamed over
+the target, so a crash mid-save never leaves a truncated checkpoint behind.
+"""
+
+import os
+import struct
+import tempfile
+import time
+import numpy as np
+from config import (
+    TIC_TAC_TOE_SIZE,
+    CHECKPOINT_EVERY_SECONDS,
+    DENSE_BOARD_INDEX_MODES,
+    INDEX_CACHE_DIR,
+)
+from board_geometry import resolve_win_length
+from model import TicTacToeModel, BOARD_INDEX_VERSION
+
+CHECKPOINT_MAGIC = b"T3CK"
+CHECKPOINT_FORMAT_VERSION = 2
+# kinds of checkpoint files
+CHECKPOINT_KIND_STATS = "stats"
+# solver results: per-board game values and optimal-move masks
+CHECKPOINT_KIND_SOLVED = "solved"
+# Q-tables of qlearning.QLearner
+CHECKPOINT_KIND_QTABLE = "qtable"
+# cached board index of a model, see TicTacToeModel.loadIndexCache
+CHECKPOINT_KIND_INDEX = "index"
+
+# magic, format version, index version, board size, win length, kind, index mode, symmetry,
+# num arrays
+_HEADER_FORMAT = "<4sIIII8s12s?I"
+_HEADER_SIZE = 64
+# name, dtype, ndim, up to 4 dimensions, offset
+_ENTRY_FORMAT = "<16s8sI4QQ"
+_ALIGNMENT = 64
+
+
+def _align(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def write_arrays(path, kind, model, arrays):
+    """
+    Atomically write named arrays to `path`, tagged with the model's board index settings.
+
+    Args:
+        path: destination file
+        kind: what the arrays are (e.g. CHECKPOINT_KIND_STATS), at most 8 characters
+        model: TicTacToeModel the arrays are indexed by
+        arrays: dictionary of name -> array (at most 4 dimensions, names up to 16 characters)
+    """
+    if model.boardIndexMode not in DENSE_BOARD_INDEX_MODES:
+        raise ValueError("Checkpoints need a model with a dense board index")
+    entries = []
+    offset = _align(_HEADER_SIZE + len(arrays) * struct.calcsize(_ENTRY_FORMAT))
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.ndim > 4:
+            raise ValueError(
+                f"Invalid array {name}: at most 4 dimensions are supported"
+            )
+        entries.append((name, array, offset))
+        offset = _align(offset + array.nbytes)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".checkpoint-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            header = struct.pack(
+                _HEADER_FORMAT,
+                CHECKPOINT_MAGIC,
+                CHECKPOINT_FORMAT_VERSION,
+                BOARD_INDEX_VERSION,
+                TIC_TAC_TOE_SIZE,
+                resolve_win_length(TIC_TAC_TOE_SIZE),
+                kind.encode(),
+                model.boardIndexMode.encode(),
+                model.useSymmetry,
+                len(entries),
+            )
+            f.write(header.ljust(_HEADER_SIZE, b"\0"))
+            for name, array, array_offset in entries:
+                dims = list(array.shape) + [0] * (4 - array.ndim)
+                f.write(
+                    struct.pack(
+                        _ENTRY_FORMAT,
+                        name.encode(),
+                        array.dtype.str.encode(),
+                        array.ndim,
+                        *dims,
+                        array_offset,
+                    )
+                )
+            for _, array, array_offset in entries:
+                f.seek(array_offset)
+                f.write(array.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_arrays(path, mmap_mode="r"):
+    """
+    Read a checkpoint file.
+
+    Args:
+        path: checkpoint file
+        mmap_mode: np.memmap mode for the arrays: "r" (read-only, shared pages),
+            "c" (copy-on-write, writable in memory only) or "r+" (writes go to the file)
+    Returns:
+        (header dictionary, dictionary of name -> memory-mapped array)
+    """
+    with open(path, "rb") as f:
+        raw_header = f.read(_HEADER_SIZE)
+        (
+            magic,
+            format_version,
+            index_version,
+            board_size,
+            win_length,
+            kind,
+            index_mode,
+            symmetry,
+            num_arrays,
+        ) = struct.unpack_from(_HEADER_FORMAT, raw_header)
+        if magic != CHECKPOINT_MAGIC:
+            raise ValueError(f"{path} is not a checkpoint file")
+        if format_version != CHECKPOINT_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported checkpoint format version {format_version} in {path}"
+            )
+        entry_size = struct.calcsize(_ENTRY_FORMAT)
+        raw_entries = f.read(num_arrays * entry_size)
+
+    header = {
+        "index_version": index_version,
+        "board_size": board_size,
+        "win_length": win_length,
+        "kind": kind.rstrip(b"\0").decode(),
+        "index_mode": index_mode.rstrip(b"\0").decode(),
+        "symmetry": symmetry,
+    }
+    arrays = {}
+    for i in range(num_arrays):
+        name, dtype, ndim, *dims, offset = struct.unpack_from(
+            _ENTRY_FORMAT, raw_entries, i * entry_size
+        )
+        arrays[name.rstrip(b"\0").decode()] = np.memmap(
+            path,
+            dtype=np.dtype(dtype.rstrip(b"\0").decode()),
+            mode=mmap_mode,
+            offset=offset,
+            shape=tuple(dims[:ndim]),
+        )
+    return header, arrays
+
+
+def check_header(header, model, kind):
+    """Raise ValueError if a checkpoint header does not match the model's board index or win rule."""
+    expected = {
+        "index_version": BOARD_INDEX_VERSION,
+        "board_size": TIC_TAC_TOE_SIZE,
+        "win_length": resolve_win_length(TIC_TAC_TOE_SIZE),
+        "kind": kind,
+        "index_mode": model.boardIndexMode,
+        "symmetry": model.useSymmetry,
+    }
+    for key, value in expected.items():
+        if header[key] != value:
+            raise ValueError(
+                f"Checkpoint {key} is {header[key]!r}, but the model expects {value!r}"
+            )
+
+
+def index_cache_path(model, cache_dir=INDEX_CACHE_DIR):
+    """Cache file for the model's board index settings (one file per combination)."""
+    symmetry = "sym" if model.useSymmetry else "nosym"
+    return os.path.join(
+        cache_dir,
+        f"index-v{BOARD_INDEX_VERSION}-{model.boardIndexMode}-{TIC_TAC_TOE_SIZE}x{TIC_TAC_TOE_SIZE}"
+        f"-k{resolve_win_length(TIC_TAC_TOE_SIZE)}-{symmetry}.ckpt",
+    )
+
+
+def save_index_cache(path, model, arrays):
+    """Atomically write a model's index arrays (creating the cache directory if needed)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    write_arrays(path, CHECKPOINT_KIND_INDEX, model, arrays)
+
+
+def load_index_cache(path, model):
+    """
+    Map a model's index arrays written by save_index_cache (read-only).
+    Raises OSError if there is no readable file and ValueError if it does not match the
+    model's settings or is damaged.
+    """
+    try:
+        header, arrays = read_arrays(path, mmap_mode="r")
+    except struct.error as error:
+        raise ValueError(f"Damaged index cache {path}: {error}") from error
+    check_header(header, model, CHECKPOINT_KIND_INDEX)
+    return arrays
+
+
+def save_checkpoint(path, model):
+    """Atomically save the model's stats to `path`."""
+    write_arrays(path, CHECKPOINT_KIND_STATS, model, {"stats": model.stats})
+
+
+def load_checkpoint(path, model=None, mmap_mode="r", index_cache_dir=INDEX_CACHE_DIR):
+    """
+    Load a stats checkpoint by memory-mapping it.
+
+    Args:
+        path: checkpoint file
+        model: optional TicTacToeModel to load into; by default one is built with the
+            index mode and symmetry setting recorded in the checkpoint
+        mmap_mode: see read_arrays. The default "r" is right for serving; use "c" to keep
+            training on top of the checkpoint without touching the file
+        index_cache_dir: index cache of the model built when `model` is None (see
+            TicTacToeModel)
+    Returns:
+        the model, with model.stats mapped from the file
+    """
+    header, arrays = read_arrays(path, mmap_mode)
+    if model is None:
+        model = TicTacToeModel(
+            board_index_mode=header["index_mode"],
+            use_symmetry=header["symmetry"],
+            index_cache_dir=index_cache_dir,
+        )
+    check_header(header, model, CHECKPOINT_KIND_STATS)
+    stats = arrays["stats"]
+    if stats.shape != model.statsShape():
+        raise ValueError(
+            f"Checkpoint stats shape {stats.shape} does not match the model's {model.statsShape()}"
+        )
+    model.stats = stats
+    model.markStatsChanged()
+    return model
+
+
+class CheckpointWriter:
+    """
+    Periodic checkpointing for long training runs.
+    Call it (or maybe_save) as often as convenient, e.g. as the on_round_end callback of
+    training.train_self_play; it only saves once enough time or games have passed.
+    """
+
+    def __init__(self, path, every_seconds=CHECKPOINT_EVERY_SECONDS, every_games=None):
+        """
+        Args:
+            path: checkpoint file (replaced atomically on every save)
+            every_seconds: save when at least this many seconds passed since the last save
+            every_games: save when at least this many games were played since the last save
+        """
+        self.path = path
+        self.every_seconds = every_seconds
+        self.every_games = every_games
+        self.last_save_time = time.monotonic()
+        self.last_save_games = 0
+        self.saves = 0
+
+    def maybe_save(self, model, games_played):
+        """Save if a threshold was crossed. Returns True if a checkpoint was written."""
+        due_by_time = (
+            self.every_seconds is not None
+            and time.monotonic() - self.last_save_time >= self.every_seconds
+        )
+        due_by_games = (
+            self.every_games is not None
+            and games_played - self.last_save_games >= self.every_games
+        )
+        if not (due_by_time or due_by_games):
+            return False
+        self.save(model, games_played)
+        return True
+
+    def save(self, model, games_played):
+        save_checkpoint(self.path, model)
+        self.last_save_time = time.monotonic()
+        self.last_save_games = games_played
+        self.saves += 1
+
+    def __call__(self, model, games_played):
+        self.maybe_save(model, games_played)
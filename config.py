@@ -2,8 +2,13 @@
 # All config lives here
 # =============================================================================
 
+import os
+
 # Board size for tic-tac-toe (default: 3x3)
 TIC_TAC_TOE_SIZE = 3
+# Pieces in a row needed to win (None = the full board width, classic rules).
+# E.g. TIC_TAC_TOE_SIZE = 15 with WIN_LENGTH = 5 plays gomoku-style
+WIN_LENGTH = None
 
 # Player symbols
 PLAYER_X = "X"
@@ -15,6 +20,99 @@ CELL_DELIMITER = " "
 GAME_WINNER_DRAW = "DRAW"
 GAME_WINNER_NONE = "NOBODY WON"
 
+# =============================================================================
+# MODEL CONFIGURATION
+# =============================================================================
+
+# Which boards the model indexes (and keeps stats for):
+# - "full": every string over {X, O, _}, i.e. 3^(size*size) boards
+# - "reachable": only positions reachable by legal play from the empty board
+# - "sparse": boards are added on first use and the stats grow with them; the only
+#   choice when 3^(size*size) is too large to enumerate (4x4 and up)
+# - "hashed": board ids are Zobrist hashes and stats live in a memory-capped store
+#   that evicts entries when full, for runs that visit more boards than fit in memory
+BOARD_INDEX_FULL = "full"
+BOARD_INDEX_REACHABLE = "reachable"
+BOARD_INDEX_SPARSE = "sparse"
+BOARD_INDEX_HASHED = "hashed"
+BOARD_INDEX_MODE = BOARD_INDEX_FULL
+# modes whose board ids are dense array indices (0 .. boards - 1)
+DENSE_BOARD_INDEX_MODES = (BOARD_INDEX_FULL, BOARD_INDEX_REACHABLE)
+# The dense modes ("full", "reachable") refuse boards with more than this many
+# possible strings (3^(size*size))
+DENSE_INDEX_MAX_BOARDS = 20_000_000
+# Memory cap of the "hashed" stats store, and which entries it evicts when full:
+# "lru" (least recently used) or "least_visited" (fewest updates)
+SPARSE_STATS_MAX_BYTES = 256 * 2**20
+SPARSE_STATS_EVICTION = "lru"
+# Check every hash the "hashed" index computes against the board it came from and raise
+# on a collision (verification only: remembers every board seen)
+ZOBRIST_CHECK_COLLISIONS = False
+
+# Share stats between boards that are rotations/reflections of each other
+USE_SYMMETRY = False
+
+# Build the model's transition tables (next board id of every move, winner, side to move,
+# legal moves) when it is created; dense board indexes only
+BUILD_TRANSITION_TABLES = False
+# Directory where dense board indexes (and their transition tables) are cached after the
+# first build, so later runs map them from disk instead of rebuilding (None disables)
+INDEX_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".index_cache"
+)
+
+# Computer opponent in main_HumanVsMachine.py:
+# - "random": random legal moves
+# - "perfect": optimal moves from the solver (never loses)
+OPPONENT_RANDOM = "random"
+OPPONENT_PERFECT = "perfect"
+HUMAN_VS_MACHINE_OPPONENT = OPPONENT_PERFECT
+
+# =============================================================================
+# TRAINING CONFIGURATION
+# =============================================================================
+
+# Self-play worker processes (None = one per CPU core)
+TRAINING_NUM_WORKERS = None
+# Games handed to a worker per task; each task is seeded by its index, so results do not
+# depend on how many workers run them
+TRAINING_GAMES_PER_TASK = 50_000
+# Games simulated in lockstep inside a task (bounds worker memory)
+TRAINING_BATCH_SIZE = 10_000
+
+# Where training saves the model, and how often (seconds) during long runs
+CHECKPOINT_PATH = "model.ckpt"
+CHECKPOINT_EVERY_SECONDS = 60
+
+# TD(lambda) / Q-learning (qlearning.py): defaults for step size, exploration,
+# lambda and games per batched update. With epsilon-greedy self-play, lambda = 0
+# (one-step Q-learning) converged fastest on 3x3; higher lambda mixes in the results
+# of exploratory moves
+QLEARNING_LEARNING_RATE = 0.3
+QLEARNING_EPSILON = 0.3
+QLEARNING_LAMBDA = 0.0
+QLEARNING_BATCH_SIZE = 1_000
+
+# =============================================================================
+# MCTS CONFIGURATION
+# =============================================================================
+# Per-move search budget of mcts.MCTSAgent: a rollout count, or a time limit in
+# milliseconds (the time limit wins when it is set)
+MCTS_ROLLOUTS_PER_MOVE = 2_000
+MCTS_TIME_BUDGET_MS = None
+# UCT exploration constant (sqrt(2) is the textbook value)
+MCTS_EXPLORATION = 1.4
+
+# =============================================================================
+# ARENA CONFIGURATION
+# =============================================================================
+# Worker processes of arena.run_arena (None = one per CPU core)
+ARENA_NUM_WORKERS = None
+# Games handed to a worker per task; each task reseeds the agents from its index
+ARENA_GAMES_PER_TASK = 500
+# Standard normal quantile of the reported confidence intervals (1.96 = 95%)
+ARENA_CONFIDENCE_Z = 1.96
+
 # =============================================================================
 # DISPLAY CONFIGURATION
 # =============================================================================
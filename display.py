@@ -7,7 +7,7 @@ import os
 import sys
 import time
 from typing import Optional, List
-from config import TIC_TAC_TOE_SIZE
+from config import TIC_TAC_TOE_SIZE, GAME_WINNER_DRAW
 
 
 class GameDisplay:
@@ -79,7 +79,7 @@ class GameDisplay:
                 print("🏆 Winner: X")
             elif game.winner == "O":
                 print("🏆 Winner: O")
-            elif game.winner == "NOBODY WON":
+            elif game.winner == GAME_WINNER_DRAW:
                 print("🤝 It's a Draw!")
 
         print("\n" + "=" * 30)
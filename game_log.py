@@ -0,0 +1,283 @@
+"""
+Append-only binary log of finished games.
+
+File layout:
+- header (8 bytes): magic, format version, board size
+- records, back to back. Each record is a little-endian uint16 payload length followed by
+  the payload: outcome (1 byte: 0 = X won, 1 = O won, 2 = draw), number of moves n (1 byte),
+  n move cells (1 byte each), n movers (1 byte each: 0 = X, 1 = O)
+Cells and move counts take one byte, so logs hold boards of up to MAX_LOG_CELLS cells (15x15).
+
+Records are only ever appended, so a crash can at worst leave one truncated record at the
+end. Readers stop cleanly before it and report the offset of the last complete record;
+replaying from that offset later picks up exactly the games written since (tailing). A
+writer reopening the log cuts such a record off before appending, so the games it writes
+are never glued onto a partial one.
+"""
+
+import os
+import struct
+import numpy as np
+from config import TIC_TAC_TOE_SIZE, DENSE_BOARD_INDEX_MODES
+from board_geometry import code_weights, move_dtype, CODE_EMPTY
+from simulator import GameBatch
+
+GAME_LOG_MAGIC = b"T3GL"
+GAME_LOG_VERSION = 1
+_FILE_HEADER_FORMAT = "<4sHH"
+FILE_HEADER_SIZE = struct.calcsize(_FILE_HEADER_FORMAT)
+_LENGTH_FORMAT = "<H"
+_LENGTH_SIZE = struct.calcsize(_LENGTH_FORMAT)
+# outcome and move count
+_RECORD_HEADER_SIZE = 2
+# cells and move counts are stored in one byte
+MAX_LOG_CELLS = 255
+
+
+def _check_file_header(raw_header, path):
+    if len(raw_header) < FILE_HEADER_SIZE:
+        raise ValueError(f"{path} is too short to be a game log")
+    magic, version, board_size = struct.unpack(_FILE_HEADER_FORMAT, raw_header)
+    if magic != GAME_LOG_MAGIC:
+        raise ValueError(f"{path} is not a game log")
+    if version != GAME_LOG_VERSION:
+        raise ValueError(f"Unsupported game log version {version} in {path}")
+    if board_size != TIC_TAC_TOE_SIZE:
+        raise ValueError(
+            f"Game log {path} is for size {board_size} boards, expected {TIC_TAC_TOE_SIZE}"
+        )
+
+
+def _file_header():
+    return struct.pack(
+        _FILE_HEADER_FORMAT, GAME_LOG_MAGIC, GAME_LOG_VERSION, TIC_TAC_TOE_SIZE
+    )
+
+
+def _end_of_complete_records(path):
+    """Offset just past the last complete record of an existing log (checks the header)."""
+    reader = GameLogReader(path)
+    for _ in reader:
+        pass
+    return reader.offset
+
+
+class GameLogWriter:
+    """Buffered, append-only writer. Use as a context manager, or call close()."""
+
+    def __init__(self, path, buffer_size=1 << 20):
+        """
+        Args:
+            path: log file; created with a header if missing, appended to otherwise. A
+                truncated record left at the end by a crash is removed first, and so is a
+                truncated header
+            buffer_size: bytes buffered before they are written to the file
+        """
+        self.path = path
+        self.num_cells = TIC_TAC_TOE_SIZE * TIC_TAC_TOE_SIZE
+        if self.num_cells > MAX_LOG_CELLS:
+            raise ValueError(
+                f"Game logs hold boards of up to {MAX_LOG_CELLS} cells; "
+                f"{TIC_TAC_TOE_SIZE}x{TIC_TAC_TOE_SIZE} boards have {self.num_cells}"
+            )
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if 0 < size < FILE_HEADER_SIZE:
+            with open(path, "rb") as f:
+                raw_header = f.read()
+            if not _file_header().startswith(raw_header):
+                raise ValueError(f"{path} is not a game log")
+            # the crash happened while the header was being written
+            size = 0
+        elif size > 0:
+            # drop a record cut short by a crash, so new records start on a record boundary
+            size = _end_of_complete_records(path)
+        is_new = size == 0
+        if os.path.exists(path):
+            os.truncate(path, size)
+        self.file = open(path, "ab", buffering=buffer_size)
+        if is_new:
+            self.file.write(_file_header())
+
+    def write_game(self, moves, players, outcome):
+        """
+        Append one game.
+
+        Args:
+            moves: cell index of every move, in order
+            players: mover of every move (0 = X, 1 = O)
+            outcome: 0 = X won, 1 = O won, 2 = draw
+        """
+        payload = bytes([outcome, len(moves)]) + bytes(moves) + bytes(players)
+        self.file.write(struct.pack(_LENGTH_FORMAT, len(payload)) + payload)
+
+    def write_batch(self, batch):
+        """Append every game of a simulator GameBatch, packed with NumPy in one go."""
+        cells = batch.moves.shape[1]
+        lengths = batch.lengths.astype(np.int64)
+        payload_lengths = _RECORD_HEADER_SIZE + 2 * lengths
+        # one padded row per record: length (2 bytes), outcome, n, moves, players
+        rows = np.zeros((len(batch), 4 + 2 * cells), dtype=np.uint8)
+        rows[:, 0] = payload_lengths & 0xFF
+        rows[:, 1] = payload_lengths >> 8
+        rows[:, 2] = batch.winners
+        rows[:, 3] = lengths
+        rows[:, 4 : 4 + cells] = batch.moves
+        rows[:, 4 + cells :] = batch.players
+        # keep the header bytes and the first n moves / players of every row
+        column = np.arange(cells)
+        valid = np.concatenate(
+            [
+                np.ones((len(batch), 4), dtype=bool),
+                column < lengths[:, None],
+                column < lengths[:, None],
+            ],
+            axis=1,
+        )
+        self.file.write(rows[valid].tobytes())
+
+    def flush(self):
+        """Push buffered records to the OS."""
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class GameLogReader:
+    """
+    Streaming reader. Iterating yields (moves, players, outcome) per game; offset is always
+    the end of the last complete record read, so it can be stored and resumed from.
+    """
+
+    def __init__(self, path, start_offset=None, chunk_size=1 << 20):
+        """
+        Args:
+            path: log file
+            start_offset: resume from this offset (a previous reader's offset);
+                defaults to the first record
+            chunk_size: bytes read from the file at a time
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        with open(path, "rb") as f:
+            _check_file_header(f.read(FILE_HEADER_SIZE), path)
+        self.offset = FILE_HEADER_SIZE if start_offset is None else start_offset
+
+    def __iter__(self):
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            pending = b""
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    # anything left over is a truncated record still being written
+                    return
+                data = pending + chunk
+                position = 0
+                while position + _LENGTH_SIZE <= len(data):
+                    (payload_length,) = struct.unpack_from(
+                        _LENGTH_FORMAT, data, position
+                    )
+                    end = position + _LENGTH_SIZE + payload_length
+                    if end > len(data):
+                        break
+                    payload = data[position + _LENGTH_SIZE : end]
+                    num_moves = payload[1]
+                    moves = payload[2 : 2 + num_moves]
+                    players = payload[2 + num_moves : 2 + 2 * num_moves]
+                    position = end
+                    self.offset += _LENGTH_SIZE + payload_length
+                    yield moves, players, payload[0]
+                pending = data[position:]
+
+    def iter_batches(self, batch_size=100_000, model=None):
+        """
+        Read the log in GameBatch chunks of up to batch_size games.
+
+        Args:
+            batch_size: games per batch
+            model: optional TicTacToeModel with a dense board index; board ids are the
+                model's ids when given, raw base-3 board codes otherwise
+        """
+        _check_replay_model(model)
+        return self._iter_batches(batch_size, model)
+
+    def _iter_batches(self, batch_size, model):
+        cells = TIC_TAC_TOE_SIZE * TIC_TAC_TOE_SIZE
+        weights = np.array(code_weights(TIC_TAC_TOE_SIZE), dtype=np.int64)
+        games = []
+        for game in self:
+            games.append(game)
+            if len(games) == batch_size:
+                yield _pack_games(games, cells, weights, model)
+                games = []
+        if games:
+            yield _pack_games(games, cells, weights, model)
+
+
+def _check_replay_model(model):
+    """Raise ValueError if board ids cannot be rebuilt from the log's moves for this model."""
+    cells = TIC_TAC_TOE_SIZE * TIC_TAC_TOE_SIZE
+    if model is not None and model.boardIndexMode not in DENSE_BOARD_INDEX_MODES:
+        raise ValueError("Replaying a game log needs a model with a dense board index")
+    if 3**cells - 1 > np.iinfo(np.int64).max:
+        raise ValueError(
+            f"Board codes of {TIC_TAC_TOE_SIZE}x{TIC_TAC_TOE_SIZE} boards do not fit in "
+            f"64 bits; game log batches support boards up to 6x6"
+        )
+
+
+def _pack_games(games, cells, weights, model):
+    """Turn (moves, players, outcome) records into a GameBatch, rebuilding board ids."""
+    num_games = len(games)
+    moves = np.zeros((num_games, cells), dtype=move_dtype(TIC_TAC_TOE_SIZE))
+    players = np.zeros((num_games, cells), dtype=np.int8)
+    lengths = np.zeros(num_games, dtype=move_dtype(TIC_TAC_TOE_SIZE))
+    winners = np.zeros(num_games, dtype=np.int8)
+    for g, (game_moves, game_players, outcome) in enumerate(games):
+        num_moves = len(game_moves)
+        moves[g, :num_moves] = np.frombuffer(game_moves, dtype=np.uint8)
+        players[g, :num_moves] = np.frombuffer(game_players, dtype=np.uint8)
+        lengths[g] = num_moves
+        winners[g] = outcome
+
+    # each move lowers the base-3 code by (CODE_EMPTY - player) * weight[cell];
+    # the code before move t is the empty board minus the deltas of moves 0..t-1
+    valid = np.arange(cells) < lengths[:, None]
+    deltas = np.where(valid, (CODE_EMPTY - players) * weights[moves], 0)
+    codes_before = (3**cells - 1) - (np.cumsum(deltas, axis=1) - deltas)
+    if model is not None:
+        board_ids = np.where(valid, model.code2id[codes_before], -1).astype(np.int32)
+    else:
+        # raw codes of boards above 3x3 do not all fit in int32
+        board_ids = np.where(valid, codes_before, -1)
+    return GameBatch(board_ids, moves, players, lengths, winners)
+
+
+def replay_into_model(path, model, start_offset=None, batch_size=100_000, weight=1):
+    """
+    Rebuild or re-weight a model from a game log, in bulk batches.
+
+    Args:
+        path: log file
+        model: TicTacToeModel with a dense board index to add the games to
+        start_offset: resume point (the offset returned by a previous call); use it to
+            tail a log that is still being written, or to recover after a crash
+        batch_size: games applied per bulk update
+        weight: how much each logged game counts (a positive integer)
+    Returns:
+        (games replayed, offset to resume from)
+    """
+    _check_replay_model(model)
+    reader = GameLogReader(path, start_offset)
+    num_games = 0
+    for batch in reader.iter_batches(batch_size, model):
+        batch.apply_to(model, weight=weight)
+        num_games += len(batch)
+    return num_games, reader.offset
@@ -1,12 +1,25 @@
 # will instatiate a game of TicTacToe and it can be played by a human against the computer
-# to begin with, the computer will only chose random moves
+# the computer plays random moves or perfect moves from the solver (HUMAN_VS_MACHINE_OPPONENT)
 from t3 import TicTacToe
 from moves import TicTacToeMoves
 from display import GameDisplay
+from config import HUMAN_VS_MACHINE_OPPONENT, OPPONENT_PERFECT, BOARD_INDEX_REACHABLE
 
 display = GameDisplay(clear_screen=True, delay=0.1)  # 0.1 second delay between moves
 game = TicTacToe()
 
+if HUMAN_VS_MACHINE_OPPONENT == OPPONENT_PERFECT:
+    from model import TicTacToeModel
+    from retrograde import RetrogradeSolver
+
+    # the index and its transition tables come from the index cache after the first run,
+    # and backward induction solves them in a few milliseconds
+    choose_computer_move = RetrogradeSolver(
+        TicTacToeModel(board_index_mode=BOARD_INDEX_REACHABLE)
+    ).choose_move
+else:
+    choose_computer_move = TicTacToeMoves().generate_random_move
+
 print(
     "Welcome to TicTacToe! You are playing against the computer. You are X and the computer is O."
 )
@@ -18,7 +31,9 @@ while not game.is_game_over:
         break
     row, col = move.split(",")
     game.make_move(int(row), int(col))
-    computer_move = TicTacToeMoves().generate_random_move(game)
+    if game.is_game_over or not game.open_positions:
+        break
+    computer_move = choose_computer_move(game)
     game.make_move(computer_move[0], computer_move[1])
     display.display_board(game, clear_screen=True)
     if game.is_game_over:
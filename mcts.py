@@ -0,0 +1,328 @@
+"""
+Monte Carlo Tree Search player (UCT).
+
+The search runs on bit masks, like bitboard.BitboardTicTacToe: a position is (x_mask,
+o_mask), and random playouts only check the lines through each played cell. Nothing is
+indexed by board id, so it works for any TIC_TAC_TOE_SIZE, including boards far too large
+for the model's tables.
+
+The tree is kept between moves: after choosing a move the agent re-roots on that child, and
+on the next call it descends through the opponent's reply, so the statistics gathered for
+those positions are reused instead of rebuilt.
+
+Optionally a TicTacToeModel seeds new children with a prior: each child starts with
+prior_visits virtual visits scored with the model's expected score for that move.
+"""
+
+import math
+import random
+import time
+from config import (
+    TIC_TAC_TOE_SIZE,
+    PLAYER_X,
+    PLAYER_O,
+    MCTS_ROLLOUTS_PER_MOVE,
+    MCTS_TIME_BUDGET_MS,
+    MCTS_EXPLORATION,
+    BOARD_INDEX_SPARSE,
+    BOARD_INDEX_HASHED,
+)
+from board_geometry import code_weights, CODE_EMPTY, CODE_X, CODE_O
+from bitboard import cell_line_masks
+from model import TURN_INDEX, OUTCOME_DRAW
+
+
+class Node:
+    """A position in the search tree, reached by `player` playing `move`."""
+
+    __slots__ = (
+        "move",
+        "player",
+        "parent",
+        "x_mask",
+        "o_mask",
+        "winner",
+        "children",
+        "visits",
+        "wins",
+    )
+
+    def __init__(self, move, player, parent, x_mask, o_mask, winner):
+        self.move = move
+        # TURN_INDEX code of the player who made `move`
+        self.player = player
+        self.parent = parent
+        self.x_mask = x_mask
+        self.o_mask = o_mask
+        # None while the game goes on, else 0 = X won, 1 = O won, OUTCOME_DRAW
+        self.winner = winner
+        # None until the node is expanded
+        self.children = None
+        self.visits = 0
+        # playout results from the point of view of `player` (a draw counts 1/2)
+        self.wins = 0.0
+
+
+class MCTSAgent:
+    def __init__(
+        self,
+        size=TIC_TAC_TOE_SIZE,
+        rollouts=MCTS_ROLLOUTS_PER_MOVE,
+        time_budget_ms=MCTS_TIME_BUDGET_MS,
+        exploration=MCTS_EXPLORATION,
+        model=None,
+        prior_visits=10,
+        seed=None,
+        win_length=None,
+    ):
+        """
+        Args:
+            size: board size
+            rollouts: playouts per move (used when time_budget_ms is None)
+            time_budget_ms: search time per move in milliseconds
+            exploration: UCT exploration constant
+            model: optional TicTacToeModel whose stats seed the children's priors
+                (only for positions in the model's index)
+            prior_visits: virtual visits a model prior is worth
+            seed: random seed for playouts
+            win_length: pieces in a row needed to win (see board_geometry.win_lines)
+        """
+        if rollouts is None and time_budget_ms is None:
+            raise ValueError("Set a rollout count or a time budget")
+        if rollouts is not None and rollouts < 1:
+            raise ValueError(f"Invalid rollouts: {rollouts}. Expected at least 1")
+        if time_budget_ms is not None and time_budget_ms <= 0:
+            raise ValueError(
+                f"Invalid time_budget_ms: {time_budget_ms}. Expected a positive value"
+            )
+        self.size = size
+        self.num_cells = size * size
+        self.full_mask = (1 << self.num_cells) - 1
+        self.cell_lines = cell_line_masks(size, win_length)
+        self.rollouts = rollouts
+        self.time_budget_ms = time_budget_ms
+        self.exploration = exploration
+        self.model = model
+        self.prior_visits = prior_visits
+        self.code_weights = code_weights(size)
+        self.rng = random.Random(seed)
+        self.root = None
+        # statistics of the last search, see search()
+        self.last_search = None
+
+    def reset(self):
+        """Drop the tree (e.g. before a new game)."""
+        self.root = None
+
+    def _game_masks(self, game):
+        """(x_mask, o_mask) of a t3.TicTacToe or bitboard.BitboardTicTacToe game."""
+        if hasattr(game, "x_mask"):
+            return game.x_mask, game.o_mask
+        x_mask = o_mask = 0
+        for row_index, row in enumerate(game.board):
+            for col_index, cell in enumerate(row):
+                bit = 1 << (row_index * self.size + col_index)
+                if cell == PLAYER_X:
+                    x_mask |= bit
+                elif cell == PLAYER_O:
+                    o_mask |= bit
+        return x_mask, o_mask
+
+    def _set_root(self, x_mask, o_mask, to_move):
+        """
+        Re-root the tree on the given position, descending through the moves played since
+        the last search when they are in the tree; otherwise start a new tree.
+        """
+        node = self.root
+        while node is not None and (node.x_mask, node.o_mask) != (x_mask, o_mask):
+            if node.children is None:
+                node = None
+                break
+            node = next(
+                (
+                    child
+                    for child in node.children
+                    if (child.x_mask & ~x_mask) == 0 and (child.o_mask & ~o_mask) == 0
+                ),
+                None,
+            )
+        if node is None or node.player == to_move:
+            node = Node(None, to_move ^ 1, None, x_mask, o_mask, None)
+        node.parent = None  # let the rest of the old tree be freed
+        self.root = node
+
+    def _priors(self, node, to_move):
+        """Model score of every move from node's position, or None if not indexed."""
+        code = 3**self.num_cells - 1
+        for cell in range(self.num_cells):
+            bit = 1 << cell
+            if node.x_mask & bit:
+                code -= (CODE_EMPTY - CODE_X) * self.code_weights[cell]
+            elif node.o_mask & bit:
+                code -= (CODE_EMPTY - CODE_O) * self.code_weights[cell]
+        if self.model.boardIndexMode == BOARD_INDEX_HASHED:
+            # boards without an entry score a neutral 0.5 everywhere
+            board_id = self.model.getBoardIdForCode(code)
+        elif self.model.boardIndexMode == BOARD_INDEX_SPARSE:
+            board_id = self.model.code2id.get(code, -1)
+        elif code < len(self.model.code2id):
+            board_id = int(self.model.code2id[code])
+        else:
+            board_id = -1
+        if board_id < 0:
+            return None
+        return self.model.getMoveScoresForBoardIds([board_id], [to_move])[0]
+
+    def _expand(self, node):
+        to_move = node.player ^ 1
+        priors = self._priors(node, to_move) if self.model is not None else None
+        occupied = node.x_mask | node.o_mask
+        node.children = []
+        for cell in range(self.num_cells):
+            bit = 1 << cell
+            if occupied & bit:
+                continue
+            x_mask, o_mask = node.x_mask, node.o_mask
+            if to_move == TURN_INDEX[PLAYER_X]:
+                x_mask |= bit
+                mover_mask = x_mask
+            else:
+                o_mask |= bit
+                mover_mask = o_mask
+            winner = None
+            for line in self.cell_lines[cell]:
+                if mover_mask & line == line:
+                    winner = to_move
+                    break
+            else:
+                if x_mask | o_mask == self.full_mask:
+                    winner = OUTCOME_DRAW
+            child = Node(cell, to_move, node, x_mask, o_mask, winner)
+            if priors is not None:
+                child.visits = self.prior_visits
+                child.wins = float(priors[cell]) * self.prior_visits
+            node.children.append(child)
+
+    def _select_child(self, node):
+        log_visits = math.log(max(node.visits, 1))
+        best_child = None
+        best_score = -1.0
+        for child in node.children:
+            if child.visits == 0:
+                return child
+            score = child.wins / child.visits + self.exploration * math.sqrt(
+                log_visits / child.visits
+            )
+            if score > best_score:
+                best_child, best_score = child, score
+        return best_child
+
+    def _playout(self, node):
+        """Play random moves from node's position to the end; return the winner code."""
+        if node.winner is not None:
+            return node.winner
+        masks = [node.x_mask, node.o_mask]
+        occupied = node.x_mask | node.o_mask
+        free = [cell for cell in range(self.num_cells) if not occupied >> cell & 1]
+        self.rng.shuffle(free)
+        player = node.player ^ 1
+        for cell in free:
+            masks[player] |= 1 << cell
+            for line in self.cell_lines[cell]:
+                if masks[player] & line == line:
+                    return player
+            player ^= 1
+        return OUTCOME_DRAW
+
+    def _iterate(self):
+        # selection
+        node = self.root
+        while node.children is not None and node.winner is None:
+            node = self._select_child(node)
+        # expansion
+        if node.winner is None:
+            self._expand(node)
+            node = self.rng.choice(node.children)
+        # simulation
+        result = self._playout(node)
+        # backpropagation
+        while node is not None:
+            node.visits += 1
+            if result == node.player:
+                node.wins += 1.0
+            elif result == OUTCOME_DRAW:
+                node.wins += 0.5
+            node = node.parent
+
+    def search(self, game):
+        """
+        Grow the tree from the game's current position within the move budget.
+
+        Returns:
+            dict with rollouts, seconds, rollouts_per_sec and reused_visits (visits the
+            root already had from earlier searches)
+        """
+        if game.is_game_over:
+            raise ValueError("Game is already over")
+        x_mask, o_mask = self._game_masks(game)
+        self._set_root(x_mask, o_mask, TURN_INDEX[game.next_player])
+        if self.root.winner is not None:
+            raise ValueError("Game is already over")
+        reused_visits = self.root.visits
+
+        rollouts = 0
+        start = time.perf_counter()
+        if self.time_budget_ms is not None:
+            deadline = start + self.time_budget_ms / 1000
+            # check the clock every few rollouts only, after at least one batch so the
+            # root always has children to choose from
+            while True:
+                for _ in range(16):
+                    self._iterate()
+                rollouts += 16
+                if time.perf_counter() >= deadline:
+                    break
+        else:
+            for _ in range(self.rollouts):
+                self._iterate()
+            rollouts = self.rollouts
+        seconds = time.perf_counter() - start
+
+        self.last_search = {
+            "rollouts": rollouts,
+            "seconds": seconds,
+            "rollouts_per_sec": rollouts / seconds if seconds > 0 else float("inf"),
+            "reused_visits": reused_visits,
+        }
+        return self.last_search
+
+    def choose_move(self, game):
+        """
+        Search from the game's position and return the (row, col) of the root's most
+        visited child. That child becomes the new root, so its subtree is reused next turn.
+        """
+        self.search(game)
+        best_child = max(self.root.children, key=lambda child: child.visits)
+        # keep the chosen subtree for the next move
+        self.root = best_child
+        best_child.parent = None
+        return (best_child.move // self.size, best_child.move % self.size)
+
+
+if __name__ == "__main__":
+    from bitboard import BitboardTicTacToe
+
+    game = BitboardTicTacToe()
+    agents = {PLAYER_X: MCTSAgent(seed=0), PLAYER_O: MCTSAgent(seed=1)}
+    while not game.is_game_over:
+        agent = agents[game.next_player]
+        row, col = agent.choose_move(game)
+        stats = agent.last_search
+        print(
+            f"{game.next_player} plays ({row},{col}): {stats['rollouts']} rollouts, "
+            f"{stats['rollouts_per_sec']:,.0f} rollouts/sec, "
+            f"{stats['reused_visits']} visits reused"
+        )
+        game.make_move(row, col)
+    game.print_board()
+    print(f"Winner: {game.winner}")
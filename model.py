@@ -1,104 +1,419 @@
 # this file will contain the model for the tic-tac-toe game
-from itertools import product
-import random
+from collections import deque
+import numpy as np
 from display import GameDisplay, format_grid
-from config import TIC_TAC_TOE_SIZE, GAME_WINNER_DRAW, PLAYER_X, PLAYER_O
+from config import (
+    TIC_TAC_TOE_SIZE,
+    GAME_WINNER_DRAW,
+    PLAYER_X,
+    PLAYER_O,
+    EMPTY_CELL,
+    BOARD_INDEX_FULL,
+    BOARD_INDEX_REACHABLE,
+    BOARD_INDEX_SPARSE,
+    BOARD_INDEX_HASHED,
+    BOARD_INDEX_MODE,
+    DENSE_BOARD_INDEX_MODES,
+    DENSE_INDEX_MAX_BOARDS,
+    ZOBRIST_CHECK_COLLISIONS,
+    USE_SYMMETRY,
+    BUILD_TRANSITION_TABLES,
+    INDEX_CACHE_DIR,
+)
+from board_geometry import (
+    code_weights,
+    board_string_to_code,
+    winner_of_board_string,
+    win_lines,
+    move_dtype,
+    CODE_X,
+    CODE_O,
+    CODE_EMPTY,
+    CELL_SYMBOLS,
+)
+from symmetry import board_transforms, inverse_board_transforms
+from zobrist import zobrist_hash_of_code, CollisionChecker
+from sparse_stats import SparseStatsStore
+
+# The stats store is one dense array indexed as
+#   stats[board_id, turn, stat, move]
+# (with symmetry enabled, the first two indices are the canonical row and move,
+#  see TicTacToeModel.buildSymmetryMappings; with the hashed index, the first index is a
+#  slot of the sparse_stats.SparseStatsStore holding the board)
+# - turn: TURN_INDEX[whose_turn] (0 for X, 1 for O)
+# - stat: one of the STAT_* rows below
+# - move: the cell index (row-major)
+TURN_INDEX = {PLAYER_X: 0, PLAYER_O: 1}
+# numeric code used for a drawn game wherever winners are stored as numbers
+# (PLAYER_X and PLAYER_O use their TURN_INDEX value)
+OUTCOME_DRAW = 2
+
+STAT_WINS = 0
+STAT_LOSSES = 1
+STAT_DRAWS = 2
+STAT_TRIES = 3
+STAT_TOTAL_WINS_X = 4
+STAT_TOTAL_WINS_O = 5
+STAT_TOTAL_DRAWS = 6
+NUM_STATS = 7
+
+# Version of the board enumeration (ids, code order). Bump it whenever the ids a
+# given configuration produces change, so saved files built on old ids are rejected.
+BOARD_INDEX_VERSION = 1
+
+# counters are exact integers; random initialization needs fractional values
+STATS_DTYPE = np.int32
+RANDOM_STATS_DTYPE = np.float32
+
+# rows allocated up front by the sparse index; arrays double in size when they fill up
+SPARSE_INITIAL_CAPACITY = 1024
+
+# transition tables (see TicTacToeModel.buildTransitionTables):
+# nextId of a move that cannot be played, boardWinner / sideToMove of a game in progress /
+# of a board that cannot occur in a legal game
+NO_BOARD = -1
+NO_WINNER = -1
+NO_SIDE = -1
+
+
+# arrays of a dense board index stored in the index cache (see loadIndexCache)
+INDEX_ARRAYS = ("id2code", "code2id", "id2cells", "canonicalRow", "moveToCanonical")
+TRANSITION_ARRAYS = (
+    "nextId",
+    "boardWinner",
+    "boardTerminal",
+    "sideToMove",
+    "legalMoveMask",
+)
 
 
 class TicTacToeModel:
-    id2board = []
-    board2id = {}
+    # board strings, built on first use from id2cells in the dense modes
+    _id2board = None
+    _board2id = None
+    code2id = None
+    id2code = None
+    id2cells = None
+    canonicalRow = None
+    moveToCanonical = None
     CELL_COMBINATIONS = []
-    stats = []
+    stats = None
+    statsGeneration = 0
+    statsChangedAt = None
     totalCellsOnBoard = TIC_TAC_TOE_SIZE * TIC_TAC_TOE_SIZE
     isRandomStats = False
-
-    def __init__(self):
-        self.id2board = []
-        self.board2id = {}
+    boardIndexMode = BOARD_INDEX_MODE
+    useSymmetry = USE_SYMMETRY
+    # sparse index only: canonical code -> stats row (with symmetry), rows in use, and
+    # the allocated buffers id2cells / canonicalRow / moveToCanonical are views of
+    sparseCanonicalRows = None
+    sparseRowsUsed = 0
+    sparseBuffers = None
+    # hashed index only: the memory-capped store that self.stats belongs to, and the
+    # collision checker of ZOBRIST_CHECK_COLLISIONS
+    statsStore = None
+    collisionChecker = None
+    # dense indexes only, None until buildTransitionTables runs
+    nextId = None
+    boardWinner = None
+    boardTerminal = None
+    sideToMove = None
+    legalMoveMask = None
+    # transition tables found in the index cache, used by buildTransitionTables
+    cachedTransitions = None
+
+    def __init__(
+        self,
+        board_index_mode=BOARD_INDEX_MODE,
+        use_symmetry=USE_SYMMETRY,
+        build_transitions=BUILD_TRANSITION_TABLES,
+        index_cache_dir=INDEX_CACHE_DIR,
+    ):
+        """
+        Args:
+            board_index_mode: BOARD_INDEX_FULL to index every string over {X, O, _},
+                BOARD_INDEX_REACHABLE to index only positions reachable by legal play
+                (about 3.5x fewer boards on 3x3, so a proportionally smaller stats table),
+                BOARD_INDEX_SPARSE to add boards on first use (large boards),
+                or BOARD_INDEX_HASHED to use Zobrist hashes as board ids and keep the stats
+                in a memory-capped store that evicts entries (see sparse_stats.py)
+            use_symmetry: if True, rotations and reflections of a board share one stats
+                entry, so every game trains all symmetric positions at once
+            build_transitions: if True, build the transition tables up front (see
+                buildTransitionTables; dense indexes only)
+            index_cache_dir: directory of the index cache (see loadIndexCache); None to
+                always build the index from scratch
+        """
+        if board_index_mode not in [
+            BOARD_INDEX_FULL,
+            BOARD_INDEX_REACHABLE,
+            BOARD_INDEX_SPARSE,
+            BOARD_INDEX_HASHED,
+        ]:
+            raise ValueError(
+                f"Invalid board_index_mode: {board_index_mode}. Expected BOARD_INDEX_FULL, BOARD_INDEX_REACHABLE, BOARD_INDEX_SPARSE or BOARD_INDEX_HASHED"
+            )
+        if board_index_mode == BOARD_INDEX_HASHED and use_symmetry:
+            raise ValueError("BOARD_INDEX_HASHED does not support use_symmetry")
+        num_cells = TIC_TAC_TOE_SIZE * TIC_TAC_TOE_SIZE
+        if (
+            board_index_mode in DENSE_BOARD_INDEX_MODES
+            and 3**num_cells > DENSE_INDEX_MAX_BOARDS
+        ):
+            raise ValueError(
+                f"A {board_index_mode} board index of {TIC_TAC_TOE_SIZE}x{TIC_TAC_TOE_SIZE} boards has up to 3^{num_cells} entries "
+                f"(limit DENSE_INDEX_MAX_BOARDS = {DENSE_INDEX_MAX_BOARDS}). Use BOARD_INDEX_SPARSE or BOARD_INDEX_HASHED"
+            )
+        self.boardIndexMode = board_index_mode
+        self.useSymmetry = use_symmetry
         self.CELL_COMBINATIONS = ["X", "O", "_"]
-        self.buildBoardStringIdMappings()
         self.totalCellsOnBoard = TIC_TAC_TOE_SIZE * TIC_TAC_TOE_SIZE
+        cacheable = (
+            board_index_mode in DENSE_BOARD_INDEX_MODES and index_cache_dir is not None
+        )
+        if not (cacheable and self.loadIndexCache(index_cache_dir)):
+            self.buildBoardStringIdMappings()
+            self.buildSymmetryMappings()
+            if cacheable:
+                self.saveIndexCache(index_cache_dir)
+        if build_transitions:
+            self.buildTransitionTables()
         self.init_stats()
 
+    @property
+    def id2board(self):
+        """Board string of every board id (built from id2cells on first use)."""
+        if self._id2board is None:
+            symbols = np.frombuffer("".join(CELL_SYMBOLS).encode(), dtype=np.uint8)
+            rows = symbols[self.id2cells].view(f"S{self.totalCellsOnBoard}").ravel()
+            self._id2board = [row.decode() for row in rows]
+        return self._id2board
+
+    @id2board.setter
+    def id2board(self, value):
+        self._id2board = value
+
+    @property
+    def board2id(self):
+        """Board id of every board string (built on first use)."""
+        if self._board2id is None:
+            self._board2id = {s: i for i, s in enumerate(self.id2board)}
+        return self._board2id
+
+    @board2id.setter
+    def board2id(self, value):
+        self._board2id = value
+
+    def loadIndexCache(self, cache_dir=INDEX_CACHE_DIR):
+        """
+        Map the dense board index (and, for buildTransitionTables, the transition tables)
+        from the cache file written by an earlier run with the same settings. The arrays
+        stay read-only memory maps, so processes share their pages; board strings are
+        only built if id2board / board2id are used.
+
+        Returns:
+            True if the index was loaded, False if there is no usable cache file
+        """
+        from checkpoint import index_cache_path, load_index_cache
+
+        try:
+            arrays = load_index_cache(index_cache_path(self, cache_dir), self)
+        except (OSError, ValueError):
+            return False
+        names = INDEX_ARRAYS if self.useSymmetry else INDEX_ARRAYS[:3]
+        if not all(name in arrays for name in names + TRANSITION_ARRAYS):
+            return False
+        for name in names:
+            setattr(self, name, np.asarray(arrays[name]))
+        if not self.useSymmetry:
+            self.canonicalRow = None
+            self.moveToCanonical = None
+        self.id2board = None
+        self.board2id = None
+        self.cachedTransitions = {
+            name: np.asarray(arrays[name]) for name in TRANSITION_ARRAYS
+        }
+        return True
+
+    def saveIndexCache(self, cache_dir=INDEX_CACHE_DIR):
+        """
+        Write the dense board index and its transition tables to the index cache.
+        Failing to write (e.g. a read-only directory) is not an error: the next run
+        just builds the index again.
+        """
+        from checkpoint import index_cache_path, save_index_cache
+
+        arrays = {"id2code": self.id2code, "code2id": self.code2id}
+        arrays["id2cells"] = self.id2cells
+        if self.useSymmetry:
+            arrays["canonicalRow"] = self.canonicalRow
+            arrays["moveToCanonical"] = self.moveToCanonical
+        arrays.update(self.computeTransitionTables())
+        try:
+            save_index_cache(index_cache_path(self, cache_dir), self, arrays)
+        except OSError:
+            pass
+
     def init_stats(self):
         if self.isRandomStats:
             self.init_stats_random()
         else:
             self.init_stats_zero()
+        # change tracking: statsGeneration counts stats writes, and
+        # statsChangedAt[row, turn] is the generation of the last write to stats[row, turn]
+        self.statsGeneration = 0
+        self.statsChangedAt = np.zeros(self.statsShape()[:2], dtype=np.int64)
+        # hashed index: (generation, hashes) of every eviction batch, so
+        # getChangedBoardIdsSince can report boards that no longer have a slot. Only the
+        # latest store-capacity worth of hashes is kept; evictionHorizon is the newest
+        # generation whose evictions were dropped
+        self.evictedKeys = deque()
+        self.evictedKeyCount = 0
+        self.evictionHorizon = 0
         return
 
+    def markStatsChanged(self, rows=None, turns=None):
+        """
+        Record a write to the stats under a new generation.
+        Called by every method that writes the stats; call it directly after changing
+        self.stats some other way (replacing the array, writes from other processes).
+
+        Args:
+            rows: stats rows written (canonical rows when symmetry is on); None for all rows
+            turns: TURN_INDEX code of each written row; None for both turns
+        Returns:
+            the new generation
+        """
+        self.statsGeneration += 1
+        if rows is None:
+            self.statsChangedAt[...] = self.statsGeneration
+        elif turns is None:
+            self.statsChangedAt[rows] = self.statsGeneration
+        else:
+            self.statsChangedAt[rows, turns] = self.statsGeneration
+        return self.statsGeneration
+
+    def _recordEviction(self, slots, keys):
+        """SparseStatsStore on_evict hook: stamp the freed slots and remember their boards."""
+        generation = self.markStatsChanged(slots)
+        self.evictedKeys.append((generation, keys))
+        self.evictedKeyCount += len(keys)
+        while self.evictedKeyCount > self.statsStore.capacity:
+            dropped_generation, dropped_keys = self.evictedKeys.popleft()
+            self.evictedKeyCount -= len(dropped_keys)
+            self.evictionHorizon = dropped_generation
+
+    def getChangedRowsSince(self, generation):
+        """
+        Stats entries written after `generation` (a value of self.statsGeneration read
+        earlier; 0 means since the stats were created).
+
+        Returns:
+            (rows, turns): arrays of stats rows and TURN_INDEX codes
+        """
+        return np.nonzero(self.statsChangedAt > generation)
+
+    def getChangedBoardIdsSince(self, generation):
+        """
+        Board ids whose stats (for either player) were written after `generation`.
+        With symmetry, every board that shares a changed canonical row is included.
+        With the hashed index, boards evicted after `generation` are included too (their
+        stats dropped to zero); generations older than the eviction record raise ValueError.
+
+        Returns:
+            sorted array of board ids
+        """
+        changed_rows = (self.statsChangedAt > generation).any(axis=1)
+        if self.boardIndexMode == BOARD_INDEX_HASHED:
+            if generation < self.evictionHorizon:
+                raise ValueError(
+                    f"Evictions before generation {self.evictionHorizon} are no longer "
+                    f"recorded; re-read every board instead of the changes since {generation}"
+                )
+            # boards in the changed slots, plus the boards evicted from slots since
+            keys = self.statsStore.keys[changed_rows]
+            evicted = [
+                hashes for when, hashes in self.evictedKeys if when > generation
+            ]
+            return np.unique(np.concatenate([keys[keys >= 0]] + evicted))
+        if self.useSymmetry:
+            return np.nonzero(changed_rows[self.canonicalRow])[0]
+        # the sparse index has allocated rows past its last board
+        return np.nonzero(changed_rows[: len(self.id2code)])[0]
+
+    def statsShape(self):
+        """
+        Shape of the stats store: (rows, turns, stats, moves).
+        There is one row per board, or one per canonical board when symmetry is on.
+        """
+        if self.boardIndexMode == BOARD_INDEX_HASHED:
+            # one row per slot of the store
+            num_rows = self.statsStore.capacity
+        elif self.boardIndexMode == BOARD_INDEX_SPARSE:
+            # allocated rows; the first sparseRowsUsed are in use
+            if self.stats is not None:
+                num_rows = self.stats.shape[0]
+            else:
+                num_rows = SPARSE_INITIAL_CAPACITY
+        elif self.useSymmetry:
+            num_rows = int(self.canonicalRow.max()) + 1
+        else:
+            num_rows = len(self.id2code)
+        return (num_rows, len(TURN_INDEX), NUM_STATS, self.totalCellsOnBoard)
+
     def init_stats_random(self):
         """
         Initialize stats with random values for all possible board states.
         IMPORTANT: Stats are now split by whose turn it is
         """
-        total_possible_boards = len(self.id2board)
+        if self.boardIndexMode == BOARD_INDEX_HASHED:
+            raise ValueError(
+                "BOARD_INDEX_HASHED stats start empty and cannot be random"
+            )
         # set the stats for the board id based on the random numbers
-        # IMPORTANT: Stats are now split by whose turn it is
-        self.stats = [
-            {
-                "X": {  # Stats when it's X's turn to move
-                    "wins": [round(random.random(), 2) for _ in range(9)],
-                    "losses": [round(random.random(), 2) for _ in range(9)],
-                    "draws": [round(random.random(), 2) for _ in range(9)],
-                    "tries": [round(random.random(), 2) for _ in range(9)],
-                    "totals": {
-                        "wins_X": [round(random.random(), 2) for _ in range(9)],
-                        "wins_O": [round(random.random(), 2) for _ in range(9)],
-                        "draws": [round(random.random(), 2) for _ in range(9)],
-                    },
-                },
-                "O": {  # Stats when it's O's turn to move
-                    "wins": [round(random.random(), 2) for _ in range(9)],
-                    "losses": [round(random.random(), 2) for _ in range(9)],
-                    "draws": [round(random.random(), 2) for _ in range(9)],
-                    "tries": [round(random.random(), 2) for _ in range(9)],
-                    "totals": {
-                        "wins_X": [round(random.random(), 2) for _ in range(9)],
-                        "wins_O": [round(random.random(), 2) for _ in range(9)],
-                        "draws": [round(random.random(), 2) for _ in range(9)],
-                    },
-                },
-            }
-            for _ in range(total_possible_boards)
-        ]
+        rng = np.random.default_rng()
+        self.stats = np.round(rng.random(self.statsShape()), 2).astype(
+            RANDOM_STATS_DTYPE
+        )
 
     def init_stats_zero(self):
         """
         Initialize stats with zero values for all possible board states (as if no games have been played).
         IMPORTANT: Stats are now split by whose turn it is
         """
+        if self.boardIndexMode == BOARD_INDEX_HASHED:
+            # entries are created on first write; evicted slots count as changed
+            self.statsStore = SparseStatsStore(
+                (len(TURN_INDEX), NUM_STATS, self.totalCellsOnBoard),
+                STATS_DTYPE,
+                on_evict=self._recordEviction,
+            )
+            self.stats = self.statsStore.entries
+            return
         # Initialize stats for all possible board states, not just the number of cells
-        # IMPORTANT: Stats are now split by whose turn it is
-        total_possible_boards = len(self.id2board)
-        self.stats = [
-            {
-                "X": {  # Stats when it's X's turn to move
-                    "wins": [0] * 9,
-                    "losses": [0] * 9,
-                    "draws": [0] * 9,
-                    "tries": [0] * 9,
-                    "totals": {
-                        "wins_X": [0] * 9,
-                        "wins_O": [0] * 9,
-                        "draws": [0] * 9,
-                    },
-                },
-                "O": {  # Stats when it's O's turn to move
-                    "wins": [0] * 9,
-                    "losses": [0] * 9,
-                    "draws": [0] * 9,
-                    "tries": [0] * 9,
-                    "totals": {
-                        "wins_X": [0] * 9,
-                        "wins_O": [0] * 9,
-                        "draws": [0] * 9,
-                    },
-                },
-            }
-            for _ in range(total_possible_boards)
-        ]
+        self.stats = np.zeros(self.statsShape(), dtype=STATS_DTYPE)
+
+    def _checkBoardIds(self, board_ids):
+        """
+        Raise ValueError unless every board id (a scalar or an array) is in the index: 0 to
+        the number of boards - 1, or any non-negative hash with the hashed index. This
+        catches the -1 that getBoardIdForGame returns for boards the index does not hold,
+        which NumPy would otherwise read as the last board.
+        """
+        if np.ndim(board_ids) == 0:
+            low = high = int(board_ids)
+        elif np.size(board_ids) == 0:
+            return
+        else:
+            low, high = int(np.min(board_ids)), int(np.max(board_ids))
+        if self.boardIndexMode == BOARD_INDEX_HASHED:
+            if low < 0:
+                raise ValueError(f"Invalid board id: {low}. Expected a board hash")
+        elif low < 0 or high >= len(self.id2code):
+            bad = low if low < 0 else high
+            raise ValueError(
+                f"Invalid board id: {bad}. Expected 0 to {len(self.id2code) - 1}"
+            )
 
     def getStatsForBoardId(self, board_id, whose_turn):
         """
@@ -108,11 +423,79 @@ class TicTacToeModel:
             board_id: the id of the board
             whose_turn: "X" or "O" - whose turn it is to move
         Returns:
-            Dictionary containing stats arrays for the specified player's turn
+            Dictionary containing stats arrays for the specified player's turn.
+            The arrays are views into the stats store, so writing to them updates the model.
+            With symmetry on, the arrays are read through the canonical board and re-ordered
+            to this board's cells; they are copies and writing to them has no effect.
+            With the hashed index, a board without an entry in the store reads as zeros
+            (copies), and views stop tracking the board once its entry is evicted.
         """
         if whose_turn not in ["X", "O"]:
             raise ValueError(f"whose_turn must be 'X' or 'O', got: {whose_turn}")
-        return self.stats[board_id][whose_turn]
+        self._checkBoardIds(board_id)
+        if self.boardIndexMode == BOARD_INDEX_HASHED:
+            slot = self.statsStore.find(board_id)
+            if slot < 0:
+                turn_stats = np.zeros(self.stats.shape[2:], dtype=self.stats.dtype)
+            else:
+                turn_stats = self.stats[slot, TURN_INDEX[whose_turn]]
+        elif self.useSymmetry:
+            row = self.canonicalRow[board_id]
+            turn_stats = self.stats[row, TURN_INDEX[whose_turn]][
+                :, self.moveToCanonical[board_id]
+            ]
+        else:
+            turn_stats = self.stats[board_id, TURN_INDEX[whose_turn]]
+        return {
+            "wins": turn_stats[STAT_WINS],
+            "losses": turn_stats[STAT_LOSSES],
+            "draws": turn_stats[STAT_DRAWS],
+            "tries": turn_stats[STAT_TRIES],
+            "totals": {
+                "wins_X": turn_stats[STAT_TOTAL_WINS_X],
+                "wins_O": turn_stats[STAT_TOTAL_WINS_O],
+                "draws": turn_stats[STAT_TOTAL_DRAWS],
+            },
+        }
+
+    def getStatsArrayForBoardIds(self, board_ids):
+        """
+        Vectorized read of the stats of many boards at once, in each board's own cell order.
+
+        Args:
+            board_ids: array of board ids
+        Returns:
+            array of shape (len(board_ids), turns, stats, moves)
+        """
+        self._checkBoardIds(board_ids)
+        if self.boardIndexMode == BOARD_INDEX_HASHED:
+            return self.statsStore.gather(board_ids)
+        board_ids = np.asarray(board_ids, dtype=np.intp)
+        if not self.useSymmetry:
+            return self.stats[board_ids]
+        rows = self.canonicalRow[board_ids]
+        moves = self.moveToCanonical[board_ids]
+        # stats[rows][k, :, :, moves[k, m]] for every board k and move m
+        return np.take_along_axis(self.stats[rows], moves[:, None, None, :], axis=3)
+
+    def getMoveScoresForBoardIds(self, board_ids, turns):
+        """
+        Expected score of every move for the player to move, from the stats:
+        (wins + 0.5 * draws + 1) / (tries + 2). The +1/+2 smoothing gives moves that were
+        never tried a neutral 0.5. Occupied cells are not masked here.
+
+        Args:
+            board_ids: array of board ids
+            turns: array of TURN_INDEX codes (whose turn it is on each board)
+        Returns:
+            float array of shape (len(board_ids), moves)
+        """
+        board_stats = self.getStatsArrayForBoardIds(board_ids)
+        turn_stats = board_stats[np.arange(len(board_stats)), np.asarray(turns)]
+        wins = turn_stats[:, STAT_WINS].astype(np.float64)
+        draws = turn_stats[:, STAT_DRAWS].astype(np.float64)
+        tries = turn_stats[:, STAT_TRIES].astype(np.float64)
+        return (wins + 0.5 * draws + 1.0) / (tries + 2.0)
 
     def getPrintableStatsForBoardIdForBothPlayers(self, board_id):
         """
@@ -250,14 +633,14 @@ class TicTacToeModel:
         """
         board_id_stats = self.getStatsForBoardId(board_id, whose_turn)
         move_stats = {}
-        move_stats["wins"] = board_id_stats["wins"][move]
-        move_stats["losses"] = board_id_stats["losses"][move]
-        move_stats["draws"] = board_id_stats["draws"][move]
-        move_stats["tries"] = board_id_stats["tries"][move]
+        move_stats["wins"] = board_id_stats["wins"][move].item()
+        move_stats["losses"] = board_id_stats["losses"][move].item()
+        move_stats["draws"] = board_id_stats["draws"][move].item()
+        move_stats["tries"] = board_id_stats["tries"][move].item()
         move_stats["totals"] = {}
-        move_stats["totals"]["wins_X"] = board_id_stats["totals"]["wins_X"][move]
-        move_stats["totals"]["wins_O"] = board_id_stats["totals"]["wins_O"][move]
-        move_stats["totals"]["draws"] = board_id_stats["totals"]["draws"][move]
+        move_stats["totals"]["wins_X"] = board_id_stats["totals"]["wins_X"][move].item()
+        move_stats["totals"]["wins_O"] = board_id_stats["totals"]["wins_O"][move].item()
+        move_stats["totals"]["draws"] = board_id_stats["totals"]["draws"][move].item()
         return move_stats
 
     def getPrintableStatsForBoardMove(self, board_id, move, whose_turn):
@@ -323,11 +706,313 @@ class TicTacToeModel:
         self.board2id = {}
         self.id2board = []
 
-        # Enumerate in a fixed order so it's reproducible and can be used for indexing.
-        for digits in product(self.CELL_COMBINATIONS, repeat=9):
-            s = "".join(digits)  # e.g., "_X_O_____"
-            self.board2id[s] = len(self.id2board)
-            self.id2board.append(s)
+        if self.boardIndexMode == BOARD_INDEX_HASHED:
+            # nothing to enumerate: board ids are hashes, computed on demand
+            self.code2id = None
+            self.id2code = None
+            self.id2cells = None
+            self.collisionChecker = (
+                CollisionChecker() if ZOBRIST_CHECK_COLLISIONS else None
+            )
+            return
+
+        if self.boardIndexMode == BOARD_INDEX_SPARSE:
+            # boards are added on first use (see getBoardIdForCode); code2id is a dict
+            # because codes of large boards do not fit in any array index
+            self.code2id = {}
+            self.id2code = []
+            self.sparseRowsUsed = 0
+            self.sparseBuffers = {
+                "id2cells": np.zeros(
+                    (SPARSE_INITIAL_CAPACITY, self.totalCellsOnBoard), dtype=np.int8
+                )
+            }
+            self.id2cells = self.sparseBuffers["id2cells"][:0]
+            return
+
+        # code2id maps the base-3 code of a board (its position in the full enumeration)
+        # to its board_id, or -1 when the board is not indexed.
+        if self.boardIndexMode == BOARD_INDEX_REACHABLE:
+            for s in self.buildReachableBoardStrings():
+                self.board2id[s] = len(self.id2board)
+                self.id2board.append(s)
+            self.id2code = np.array(
+                [board_string_to_code(s) for s in self.id2board], dtype=np.int64
+            )
+            self.code2id = np.full(3**self.totalCellsOnBoard, -1, dtype=np.int32)
+            self.code2id[self.id2code] = np.arange(len(self.id2board), dtype=np.int32)
+        else:
+            # every string over {X, O, _} in itertools.product order, which is the order
+            # of the base-3 codes, so a board id is its code; the board strings are built
+            # lazily (see id2board)
+            num_boards = 3**self.totalCellsOnBoard
+            self.id2code = np.arange(num_boards, dtype=np.int64)
+            self.code2id = np.arange(num_boards, dtype=np.int32)
+            self.id2board = None
+            self.board2id = None
+
+        # id2cells[board_id] holds the cell codes of the board (X=0, O=1, _=2)
+        weights = np.array(code_weights(TIC_TAC_TOE_SIZE), dtype=np.int64)
+        self.id2cells = ((self.id2code[:, None] // weights) % 3).astype(np.int8)
+
+    def buildSymmetryMappings(self):
+        """
+        Map every board to the stats row of its canonical form (the rotation/reflection
+        with the smallest base-3 code) and every move to the matching canonical cell.
+
+        - canonicalRow[board_id]: row of the stats store used by this board
+        - moveToCanonical[board_id, move]: cell of the canonical board that `move` maps to
+        """
+        if not self.useSymmetry:
+            self.canonicalRow = None
+            self.moveToCanonical = None
+            return
+
+        if self.boardIndexMode == BOARD_INDEX_SPARSE:
+            # filled in board by board as boards are added
+            self.sparseCanonicalRows = {}
+            self.sparseBuffers["canonicalRow"] = np.zeros(
+                SPARSE_INITIAL_CAPACITY, dtype=np.int32
+            )
+            self.sparseBuffers["moveToCanonical"] = np.zeros(
+                (SPARSE_INITIAL_CAPACITY, self.totalCellsOnBoard),
+                dtype=move_dtype(TIC_TAC_TOE_SIZE),
+            )
+            self.canonicalRow = self.sparseBuffers["canonicalRow"][:0]
+            self.moveToCanonical = self.sparseBuffers["moveToCanonical"][:0]
+            return
+
+        weights = np.array(code_weights(TIC_TAC_TOE_SIZE), dtype=np.int64)
+        transforms = np.array(board_transforms(TIC_TAC_TOE_SIZE), dtype=np.intp)
+        inverses = np.array(
+            inverse_board_transforms(TIC_TAC_TOE_SIZE),
+            dtype=move_dtype(TIC_TAC_TOE_SIZE),
+        )
+
+        # codes of every board under every transform: shape (boards, 8)
+        transformed_codes = np.stack(
+            [self.id2cells[:, perm].astype(np.int64) @ weights for perm in transforms],
+            axis=1,
+        )
+        canonical_codes = transformed_codes.min(axis=1)
+        _, rows = np.unique(canonical_codes, return_inverse=True)
+        self.canonicalRow = rows.astype(np.int32)
+
+        # Several transforms can produce the canonical board when it is itself symmetric
+        # (e.g. the empty board); equivalent cells then share one entry by taking the
+        # smallest canonical cell any of those transforms maps the move to.
+        is_canonical = transformed_codes == canonical_codes[:, None]
+        candidates = np.where(
+            is_canonical[:, :, None],
+            inverses[None, :, :],
+            np.iinfo(inverses.dtype).max,
+        )
+        self.moveToCanonical = candidates.min(axis=1)
+
+    def buildTransitionTables(self):
+        """
+        Precompute the game rules over the whole board index, so that playing a move is an
+        array lookup instead of board arithmetic. Does nothing if already built.
+
+        - nextId[board_id, move]: board id after the player to move plays `move` (int32),
+          or NO_BOARD if the move cannot be played
+        - boardWinner[board_id]: 0 = X won, 1 = O won, OUTCOME_DRAW, or NO_WINNER
+        - boardTerminal[board_id]: True when the game is over
+        - sideToMove[board_id]: TURN_INDEX code of the player to move (X moves first)
+        - legalMoveMask[board_id]: bit `move` set for every move that can be played
+
+        Boards that cannot occur in a legal game (in the full index: wrong piece counts, or
+        a win by the player who did not move last) get NO_SIDE, NO_WINNER and no moves.
+        """
+        if self.boardIndexMode not in DENSE_BOARD_INDEX_MODES:
+            raise ValueError("Transition tables need a dense board index")
+        if self.nextId is not None:
+            return
+        tables = self.cachedTransitions or self.computeTransitionTables()
+        for name in TRANSITION_ARRAYS:
+            setattr(self, name, tables[name])
+
+    def computeTransitionTables(self):
+        """
+        The arrays of buildTransitionTables, computed from the board index.
+
+        Returns:
+            dictionary of name -> array
+        """
+        if self.nextId is not None:
+            return {name: getattr(self, name) for name in TRANSITION_ARRAYS}
+        cells = self.id2cells
+        num_cells = self.totalCellsOnBoard
+        x_count = (cells == CODE_X).sum(axis=1)
+        o_count = (cells == CODE_O).sum(axis=1)
+        lines = np.array(win_lines(TIC_TAC_TOE_SIZE), dtype=np.intp)
+        x_wins = (cells[:, lines] == CODE_X).all(axis=2).any(axis=1)
+        o_wins = (cells[:, lines] == CODE_O).all(axis=2).any(axis=1)
+        # consistent boards: X moves first, and only the player who just moved can have won
+        valid = (
+            ((x_count == o_count) | (x_count == o_count + 1))
+            & ~(x_wins & o_wins)
+            & ~(x_wins & (x_count != o_count + 1))
+            & ~(o_wins & (x_count != o_count))
+        )
+        full = x_count + o_count == num_cells
+
+        winner = np.full(len(cells), NO_WINNER, dtype=np.int8)
+        winner[x_wins] = TURN_INDEX[PLAYER_X]
+        winner[o_wins] = TURN_INDEX[PLAYER_O]
+        winner[full & ~x_wins & ~o_wins] = OUTCOME_DRAW
+        winner[~valid] = NO_WINNER
+        terminal = winner != NO_WINNER
+        side = np.where(x_count == o_count, TURN_INDEX[PLAYER_X], TURN_INDEX[PLAYER_O])
+
+        legal = (cells == CODE_EMPTY) & (valid & ~terminal)[:, None]
+        mask_dtype = np.min_scalar_type(2**num_cells - 1)
+        legal_mask = (
+            legal.astype(mask_dtype) << np.arange(num_cells, dtype=mask_dtype)
+        ).sum(axis=1, dtype=mask_dtype)
+
+        # cell codes equal TURN_INDEX codes, so a move turns CODE_EMPTY into `side`
+        weights = np.array(code_weights(TIC_TAC_TOE_SIZE), dtype=np.int64)
+        codes = self.id2code[:, None]
+        child_codes = codes - (CODE_EMPTY - side)[:, None] * weights
+        next_id = np.where(
+            legal, self.code2id[np.where(legal, child_codes, codes)], NO_BOARD
+        ).astype(np.int32)
+        return {
+            "nextId": next_id,
+            "boardWinner": winner,
+            "boardTerminal": terminal,
+            "sideToMove": np.where(valid, side, NO_SIDE).astype(np.int8),
+            "legalMoveMask": legal_mask,
+        }
+
+    def getBoardIdForGame(self, game):
+        """
+        Board id of a game's current position, read from the base-3 code the game engines
+        (t3.TicTacToe, bitboard.BitboardTicTacToe) maintain on every move.
+        Returns -1 if the position is not in the index (sparse indexes add it instead).
+        The hashed index uses the Zobrist hash the engines maintain the same way.
+        """
+        if self.boardIndexMode == BOARD_INDEX_HASHED:
+            if self.collisionChecker is not None:
+                self.collisionChecker.check(game.zobrist_hash, game.board_code)
+            return game.zobrist_hash
+        return self.getBoardIdForCode(game.board_code)
+
+    def getBoardIdForCode(self, code):
+        """
+        Board id of a base-3 board code. Dense indexes return -1 for boards they do not
+        hold; the sparse index adds unseen boards (and grows the stats to fit); the hashed
+        index returns the board's Zobrist hash.
+        """
+        if self.boardIndexMode == BOARD_INDEX_HASHED:
+            board_hash = zobrist_hash_of_code(code, TIC_TAC_TOE_SIZE)
+            if self.collisionChecker is not None:
+                self.collisionChecker.check(board_hash, code)
+            return board_hash
+        if self.boardIndexMode != BOARD_INDEX_SPARSE:
+            return int(self.code2id[code])
+        board_id = self.code2id.get(code)
+        if board_id is None:
+            board_id = self.addSparseBoard(code)
+        return board_id
+
+    def addSparseBoard(self, code):
+        """
+        Add a board to the sparse index and return its new board id.
+        Its stats row is fresh, or shared with an earlier symmetric board.
+        """
+        weights = code_weights(TIC_TAC_TOE_SIZE)
+        cells = [code // weight % 3 for weight in weights]
+        board_id = len(self.id2code)
+        board_string = "".join(CELL_SYMBOLS[cell] for cell in cells)
+        self.code2id[code] = board_id
+        self.id2code.append(code)
+        self.board2id[board_string] = board_id
+        self.id2board.append(board_string)
+
+        row = board_id
+        if self.useSymmetry:
+            # same rules as buildSymmetryMappings, for one board
+            transformed_codes = [
+                sum(cells[perm[i]] * weights[i] for i in range(len(cells)))
+                for perm in board_transforms(TIC_TAC_TOE_SIZE)
+            ]
+            canonical_code = min(transformed_codes)
+            inverses = [
+                inverse
+                for inverse, transformed_code in zip(
+                    inverse_board_transforms(TIC_TAC_TOE_SIZE), transformed_codes
+                )
+                if transformed_code == canonical_code
+            ]
+            move_map = [
+                min(inverse[move] for inverse in inverses) for move in range(len(cells))
+            ]
+            row = self.sparseCanonicalRows.setdefault(
+                canonical_code, len(self.sparseCanonicalRows)
+            )
+
+        num_boards = board_id + 1
+        for name, buffer in self.sparseBuffers.items():
+            if len(buffer) < num_boards:
+                grown = np.zeros(
+                    (2 * len(buffer),) + buffer.shape[1:], dtype=buffer.dtype
+                )
+                grown[: len(buffer)] = buffer
+                self.sparseBuffers[name] = buffer = grown
+        self.sparseBuffers["id2cells"][board_id] = cells
+        self.id2cells = self.sparseBuffers["id2cells"][:num_boards]
+        if self.useSymmetry:
+            self.sparseBuffers["canonicalRow"][board_id] = row
+            self.sparseBuffers["moveToCanonical"][board_id] = move_map
+            self.canonicalRow = self.sparseBuffers["canonicalRow"][:num_boards]
+            self.moveToCanonical = self.sparseBuffers["moveToCanonical"][:num_boards]
+
+        self.sparseRowsUsed = max(self.sparseRowsUsed, row + 1)
+        if self.sparseRowsUsed > self.stats.shape[0]:
+            # double the stats (and their change stamps); views handed out earlier by
+            # getStatsForBoardId keep pointing at the old array
+            capacity = 2 * self.stats.shape[0]
+            stats = np.zeros((capacity,) + self.stats.shape[1:], dtype=self.stats.dtype)
+            stats[: self.stats.shape[0]] = self.stats
+            changed_at = np.zeros(
+                (capacity,) + self.statsChangedAt.shape[1:], dtype=np.int64
+            )
+            changed_at[: self.statsChangedAt.shape[0]] = self.statsChangedAt
+            self.stats = stats
+            self.statsChangedAt = changed_at
+        return board_id
+
+    def buildReachableBoardStrings(self):
+        """
+        Enumerate every position reachable by legal play from the empty board:
+        X moves first, players alternate, and nobody moves after a win.
+
+        Returns:
+            list of board strings, in the same relative order as the full enumeration
+        """
+        empty_board = EMPTY_CELL * self.totalCellsOnBoard
+        seen = {empty_board}
+        frontier = [empty_board]
+        # expand one ply at a time
+        while frontier:
+            next_frontier = []
+            for board_string in frontier:
+                if winner_of_board_string(board_string) is not None:
+                    continue  # no play after a win
+                x_count = board_string.count(PLAYER_X)
+                o_count = board_string.count(PLAYER_O)
+                player = PLAYER_X if x_count == o_count else PLAYER_O
+                for i, cell in enumerate(board_string):
+                    if cell != EMPTY_CELL:
+                        continue
+                    child = board_string[:i] + player + board_string[i + 1 :]
+                    if child not in seen:
+                        seen.add(child)
+                        next_frontier.append(child)
+            frontier = next_frontier
+        return sorted(seen, key=board_string_to_code)
 
     def setMoveStatsForBoardId(self, board_id, move, whose_turn, who_won):
         """
@@ -342,31 +1027,12 @@ class TicTacToeModel:
 
         Stats are only updated for the player making the move (whose_turn).
 
-        For reference, Sample stats format:
-        stats[board_id] = {
-            "X": {  # When it's X's turn
-                "wins": [0.5, 0.3, 0.2, ...],
-                "losses": [0.3, 0.2, 0.1, ...],
-                "draws": [0.2, 0.1, 0.0, ...],
-                "tries": [10, 10, 10, ...],
-                "totals": {
-                    "wins_X": [0.5, 0.3, 0.2, ...],
-                    "wins_O": [0.3, 0.2, 0.1, ...],
-                    "draws": [0.2, 0.1, 0.0, ...],
-                },
-            },
-            "O": {  # When it's O's turn
-                "wins": [0.5, 0.3, 0.2, ...],
-                "losses": [0.3, 0.2, 0.1, ...],
-                "draws": [0.2, 0.1, 0.0, ...],
-                "tries": [10, 10, 10, ...],
-                "totals": {
-                    "wins_X": [0.5, 0.3, 0.2, ...],
-                    "wins_O": [0.3, 0.2, 0.1, ...],
-                    "draws": [0.2, 0.1, 0.0, ...],
-                },
-            },
-        }
+        For reference, stats layout (see the STAT_* constants at the top of the file):
+        stats[board_id, TURN_INDEX[whose_turn], STAT_WINS, move]    -> wins
+        stats[board_id, TURN_INDEX[whose_turn], STAT_LOSSES, move]  -> losses
+        stats[board_id, TURN_INDEX[whose_turn], STAT_DRAWS, move]   -> draws
+        stats[board_id, TURN_INDEX[whose_turn], STAT_TRIES, move]   -> tries
+        stats[board_id, TURN_INDEX[whose_turn], STAT_TOTAL_*, move] -> totals (wins_X, wins_O, draws)
 
         Args:
             board_id: the id of the board
@@ -391,40 +1057,48 @@ class TicTacToeModel:
         # - is_draw: the game ended in a draw
         # - is_win_for_whose_turn: the game ended in a win for whose_turn (whose_turn won)
         # - is_loss_for_whose_turn: the game ended in a loss for whose_turn (whose_turn lost)
+        self._checkBoardIds(board_id)
+
         is_draw = who_won == GAME_WINNER_DRAW or who_won is None
         is_win_for_whose_turn = not is_draw and who_won == whose_turn
         is_loss_for_whose_turn = not is_draw and who_won != whose_turn
 
-        # getStatsForBoardId returns stats[board_id][whose_turn]
-        stats_to_update = self.getStatsForBoardId(board_id, whose_turn)
+        # index straight into the stats store: turn_stats is stats[board_id, turn]
+        if self.useSymmetry:
+            # write into the canonical entry instead
+            move = self.moveToCanonical[board_id, move]
+            board_id = self.canonicalRow[board_id]
+        elif self.boardIndexMode == BOARD_INDEX_HASHED:
+            # the board's slot in the store, created on its first write
+            board_id = self.statsStore.slot_for(board_id)
+        turn_stats = self.stats[board_id, TURN_INDEX[whose_turn]]
+        self.markStatsChanged(board_id, TURN_INDEX[whose_turn])
 
         # Always increment tries for this move
-        stats_to_update["tries"][move] += 1
+        turn_stats[STAT_TRIES, move] += 1
 
         if is_win_for_whose_turn:
             # This move by whose_turn led to a win for whose_turn
-            stats_to_update["wins"][move] += 1
+            turn_stats[STAT_WINS, move] += 1
             if whose_turn == PLAYER_X:
-                stats_to_update["totals"]["wins_X"][move] += 1
+                turn_stats[STAT_TOTAL_WINS_X, move] += 1
             else:  # whose_turn == PLAYER_O
-                stats_to_update["totals"]["wins_O"][move] += 1
+                turn_stats[STAT_TOTAL_WINS_O, move] += 1
 
         elif is_loss_for_whose_turn:
             # This move by whose_turn led to a loss for whose_turn (opponent won)
-            stats_to_update["losses"][move] += 1
+            turn_stats[STAT_LOSSES, move] += 1
             if whose_turn == PLAYER_X:
                 # X lost, so O won
-                stats_to_update["totals"]["wins_O"][move] += 1
+                turn_stats[STAT_TOTAL_WINS_O, move] += 1
             else:  # whose_turn == PLAYER_O
                 # O lost, so X won
-                stats_to_update["totals"]["wins_X"][move] += 1
+                turn_stats[STAT_TOTAL_WINS_X, move] += 1
 
         elif is_draw:
             # This move led to a draw
-            stats_to_update["draws"][move] += 1
-            stats_to_update["totals"]["draws"][move] += 1
-
-        self.stats[board_id][whose_turn] = stats_to_update
+            turn_stats[STAT_DRAWS, move] += 1
+            turn_stats[STAT_TOTAL_DRAWS, move] += 1
         return
 
     def setMoveStatsForEntireGameFromHistory(self, history, who_won):
@@ -466,11 +1140,144 @@ class TicTacToeModel:
                 f"Invalid who_won value: {who_won}. Expected PLAYER_X, PLAYER_O, GAME_WINNER_DRAW, or None"
             )
 
-        # Cycle through history and update stats for each move
-        for board_id, move, who_moved in history:
-            self.setMoveStatsForBoardId(board_id, move, who_moved, who_won)
+        # verify the movers once up front, then apply the whole game as one scatter-add
+        for _, _, who_moved in history:
+            if who_moved not in [PLAYER_X, PLAYER_O]:
+                raise ValueError(
+                    f"Invalid whose_turn value: {who_moved}. Expected PLAYER_X or PLAYER_O"
+                )
+
+        board_ids = np.fromiter(
+            (h[0] for h in history), dtype=np.intp, count=len(history)
+        )
+        self._checkBoardIds(board_ids)
+        moves = np.fromiter((h[1] for h in history), dtype=np.intp, count=len(history))
+        turns = np.fromiter(
+            (TURN_INDEX[h[2]] for h in history), dtype=np.intp, count=len(history)
+        )
+        winner = (
+            OUTCOME_DRAW if who_won in [GAME_WINNER_DRAW, None] else TURN_INDEX[who_won]
+        )
+        self._addMoveStats(board_ids, moves, turns, np.full(len(history), winner))
         return
 
+    def setMoveStatsFromBatch(
+        self, board_ids, moves, players, outcomes, weight=1, stats=None
+    ):
+        """
+        Bulk version of setMoveStatsForEntireGameFromHistory: add the moves of many games at
+        once, given as packed arrays with one row per move. The rows are validated once and
+        applied with a single grouped add, however many games they come from.
+
+        Args:
+            board_ids: board id before each move
+            moves: cell index of each move
+            players: mover of each move as a TURN_INDEX code (0 = X, 1 = O)
+            outcomes: result of the game each move belongs to
+                (0 = X won, 1 = O won, OUTCOME_DRAW = draw)
+            weight: how much each row counts, a positive integer (the counters are integers)
+            stats: optional array shaped like self.stats to add into instead (e.g. a
+                training shard; not available with the hashed index)
+        """
+        board_ids = np.asarray(board_ids, dtype=np.intp)
+        moves = np.asarray(moves, dtype=np.intp)
+        players = np.asarray(players, dtype=np.intp)
+        outcomes = np.asarray(outcomes, dtype=np.intp)
+        if not (board_ids.shape == moves.shape == players.shape == outcomes.shape):
+            raise ValueError(
+                f"Invalid batch: board_ids, moves, players and outcomes have shapes "
+                f"{board_ids.shape}, {moves.shape}, {players.shape}, {outcomes.shape}. "
+                f"Expected equal-length 1D arrays"
+            )
+        if board_ids.ndim != 1:
+            raise ValueError(
+                f"Invalid batch: expected 1D arrays, got {board_ids.ndim}D"
+            )
+        if (
+            isinstance(weight, bool)
+            or not isinstance(weight, (int, np.integer))
+            or weight < 1
+        ):
+            raise ValueError(f"Invalid weight: {weight!r}. Expected a positive integer")
+        if board_ids.size == 0:
+            return
+        if self.boardIndexMode == BOARD_INDEX_HASHED:
+            # slots move as entries are evicted, so a shard could not be merged back
+            if stats is not None:
+                raise ValueError("BOARD_INDEX_HASHED does not support stats shards")
+        self._checkBoardIds(board_ids)
+        if moves.min() < 0 or moves.max() >= self.totalCellsOnBoard:
+            raise ValueError(
+                f"Invalid move in batch. Expected 0 to {self.totalCellsOnBoard - 1}"
+            )
+        if players.min() < 0 or players.max() > 1:
+            raise ValueError("Invalid player in batch. Expected 0 (X) or 1 (O)")
+        if outcomes.min() < 0 or outcomes.max() > OUTCOME_DRAW:
+            raise ValueError(
+                f"Invalid outcome in batch. Expected 0 (X), 1 (O) or {OUTCOME_DRAW} (draw)"
+            )
+        if self.id2cells is not None and (
+            (self.id2cells[board_ids, moves] != CODE_EMPTY).any()
+        ):
+            raise ValueError("Invalid move in batch: cell already taken")
+        self._addMoveStats(
+            board_ids, moves, players, outcomes, stats=stats, weight=weight
+        )
+
+    def mergeStats(self, shard):
+        """
+        Add a stats shard (an array shaped like self.stats, e.g. the counters a training
+        worker collected on its own) into this model, element-wise.
+        """
+        if self.boardIndexMode == BOARD_INDEX_HASHED:
+            raise ValueError("BOARD_INDEX_HASHED does not support stats shards")
+        if shard.shape != self.stats.shape:
+            raise ValueError(
+                f"Invalid shard shape: {shard.shape}. Expected {self.stats.shape}"
+            )
+        self.stats += shard
+        touched = shard.reshape(shard.shape[0], shard.shape[1], -1).any(axis=2)
+        self.markStatsChanged(*np.nonzero(touched))
+
+    def _addMoveStats(self, board_ids, moves, turns, winners, stats=None, weight=1):
+        """
+        Vectorized core of the stats update: one row per move, all arguments are equal-length
+        integer arrays. turns and winners use TURN_INDEX codes (winners may also be OUTCOME_DRAW).
+        Repeated (board_id, turn, move) rows are accumulated, not overwritten.
+        stats: optional array shaped like self.stats to add into instead (a training shard;
+            shards are not change-tracked until they are merged).
+        weight: amount added per row (1 counts each game once)
+        """
+        if stats is None:
+            stats = self.stats
+        if self.useSymmetry:
+            moves = self.moveToCanonical[board_ids, moves]
+            board_ids = self.canonicalRow[board_ids]
+        elif self.boardIndexMode == BOARD_INDEX_HASHED:
+            board_ids = self.statsStore.slots_for(board_ids)
+        is_draw = winners == OUTCOME_DRAW
+        # wins/losses/draws from the mover's perspective
+        result_rows = np.where(
+            is_draw, STAT_DRAWS, np.where(turns == winners, STAT_WINS, STAT_LOSSES)
+        )
+        # totals only depend on who won the game
+        totals_rows = np.where(is_draw, STAT_TOTAL_DRAWS, STAT_TOTAL_WINS_X + winners)
+        # every move adds to three counters; group them by flat stats index and add each
+        # distinct counter once (much faster than np.add.at on large batches)
+        entry = (board_ids * len(TURN_INDEX) + turns) * NUM_STATS
+        counters = np.concatenate(
+            [
+                (entry + STAT_TRIES) * self.totalCellsOnBoard + moves,
+                (entry + result_rows) * self.totalCellsOnBoard + moves,
+                (entry + totals_rows) * self.totalCellsOnBoard + moves,
+            ]
+        )
+        counters, counts = np.unique(counters, return_counts=True)
+        # stats arrays are always C-contiguous, so this is a view
+        stats.reshape(-1)[counters] += counts * weight
+        if stats is self.stats:
+            self.markStatsChanged(board_ids, turns)
+
 
 # move all test functionality in to a separate function.
 # need not be part of the class.
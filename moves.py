@@ -1,5 +1,5 @@
 import random
-from t3 import TicTacToe, STRING_X, STRING_O
+from t3 import TicTacToe, STRING_X, STRING_O, TIC_TAC_TOE_SIZE
 
 
 class TicTacToeMoves:
@@ -8,7 +8,7 @@ class TicTacToeMoves:
     """
 
     def __init__(self):
-        self.size = 3
+        self.size = TIC_TAC_TOE_SIZE
 
     def movesForXWin(self):
         """
@@ -54,12 +54,12 @@ class TicTacToeMoves:
             (2, 2, "Player X moves to (2,2)"),  # Draw - no winner
         ]
 
-    def generate_random_moves(self, max_moves=9):
+    def generate_random_moves(self, max_moves=None):
         """
         Generate full game play through with random legal moves for testing.
 
         Args:
-            max_moves (int): Maximum number of moves to generate (default: 9 for full board)
+            max_moves (int): Maximum number of moves to generate (default: every cell of the board)
 
         Returns:
             list: List of tuples in format (row, col, description)
@@ -68,6 +68,8 @@ class TicTacToeMoves:
         moves = []
         current_player = STRING_X
 
+        if max_moves is None:
+            max_moves = self.size * self.size
         # Generate random moves until game is over or max_moves reached
         for move_num in range(max_moves):
             if game.is_game_over:
@@ -0,0 +1,182 @@
+"""
+Move selection compiled from a TicTacToeModel snapshot.
+
+Reading the stats, working out the score of every move and masking occupied cells is done
+once per board when the policy is compiled, not on every move. choose_move then costs one
+array index (plus one random draw when exploring or sampling).
+
+Modes:
+- POLICY_GREEDY: always the best-scoring legal move
+- POLICY_EPSILON_GREEDY: a random legal move with probability epsilon, otherwise the best
+- POLICY_SOFTMAX: sample a legal move with probability proportional to
+  exp(score / temperature)
+
+Scores are model.getMoveScoresForBoardIds. A compiled policy does not follow later changes
+to the stats by itself: refresh_changed() recompiles just the boards the model reports as
+written since the last compile, so keeping a policy current during training costs time
+proportional to the games played, not to the size of the table.
+"""
+
+import numpy as np
+from config import TIC_TAC_TOE_SIZE, DENSE_BOARD_INDEX_MODES
+from board_geometry import CODE_EMPTY, move_dtype
+from model import TURN_INDEX
+
+POLICY_GREEDY = "greedy"
+POLICY_EPSILON_GREEDY = "epsilon_greedy"
+POLICY_SOFTMAX = "softmax"
+POLICY_MODES = (POLICY_GREEDY, POLICY_EPSILON_GREEDY, POLICY_SOFTMAX)
+
+# best_move of a board without legal moves
+NO_MOVE = -1
+
+
+class Policy:
+    def __init__(
+        self,
+        model,
+        mode=POLICY_GREEDY,
+        epsilon=0.1,
+        temperature=0.1,
+        with_probabilities=None,
+        seed=None,
+        batch_size=65_536,
+    ):
+        """
+        Compile a policy from the model's current stats.
+
+        Args:
+            model: TicTacToeModel to compile from
+            mode: POLICY_GREEDY, POLICY_EPSILON_GREEDY or POLICY_SOFTMAX
+            epsilon: exploration probability for POLICY_EPSILON_GREEDY
+            temperature: softmax temperature for POLICY_SOFTMAX (lower is greedier)
+            with_probabilities: also compile the softmax probability vector of every board;
+                defaults to True for POLICY_SOFTMAX and False otherwise
+            seed: seed for exploration and sampling
+            batch_size: boards scored at a time while compiling
+        """
+        if model.boardIndexMode not in DENSE_BOARD_INDEX_MODES:
+            raise ValueError("Policy needs a model with a dense board index")
+        if mode not in POLICY_MODES:
+            raise ValueError(f"Invalid mode: {mode}. Expected one of {POLICY_MODES}")
+        if temperature <= 0:
+            raise ValueError(f"Invalid temperature: {temperature}. Must be positive")
+        self.model = model
+        self.mode = mode
+        self.epsilon = epsilon
+        self.temperature = temperature
+        if with_probabilities is None:
+            with_probabilities = mode == POLICY_SOFTMAX
+        elif mode == POLICY_SOFTMAX and not with_probabilities:
+            raise ValueError("POLICY_SOFTMAX needs with_probabilities")
+        self.with_probabilities = with_probabilities
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+
+        num_boards, num_cells = model.id2cells.shape
+        self.num_cells = num_cells
+        # best_move[board_id, turn]: best legal cell for the player to move, or NO_MOVE
+        self.best_move = np.full(
+            (num_boards, 2), NO_MOVE, dtype=move_dtype(TIC_TAC_TOE_SIZE)
+        )
+        # cumulative_probs[board_id, turn]: running sum of the softmax probabilities over the
+        # cells, so sampling is one uniform draw and a binary search
+        self.cumulative_probs = None
+        if with_probabilities:
+            self.cumulative_probs = np.zeros(
+                (num_boards, 2, num_cells), dtype=np.float32
+            )
+        self.compile()
+
+    def compile(self):
+        """Recompile every board from the model's current stats."""
+        self.generation = self.model.statsGeneration
+        num_boards = len(self.best_move)
+        for start in range(0, num_boards, self.batch_size):
+            self.refresh(np.arange(start, min(start + self.batch_size, num_boards)))
+
+    def refresh(self, board_ids):
+        """
+        Recompile only the given boards (e.g. the ones whose stats changed since the last
+        compile), for both players.
+        """
+        board_ids = np.asarray(board_ids, dtype=np.intp)
+        if board_ids.size == 0:
+            return
+        legal = self.model.id2cells[board_ids] == CODE_EMPTY
+        has_move = legal.any(axis=1)
+        for turn in TURN_INDEX.values():
+            turns = np.full(len(board_ids), turn, dtype=np.intp)
+            scores = self.model.getMoveScoresForBoardIds(board_ids, turns)
+            scores = np.where(legal, scores, -np.inf)
+            self.best_move[board_ids, turn] = np.where(
+                has_move, np.argmax(scores, axis=1), NO_MOVE
+            )
+            if self.cumulative_probs is not None:
+                # subtract the row maximum before exp to avoid overflow
+                top = np.where(has_move, scores.max(axis=1), 0.0)
+                weights = np.exp((scores - top[:, None]) / self.temperature)
+                weights = np.where(legal, weights, 0.0)
+                total = np.maximum(weights.sum(axis=1, keepdims=True), 1e-300)
+                self.cumulative_probs[board_ids, turn] = np.cumsum(
+                    weights / total, axis=1
+                )
+
+    def refresh_changed(self):
+        """
+        Recompile the boards whose stats changed since the last compile or refresh_changed.
+
+        Returns:
+            number of boards recompiled
+        """
+        generation = self.model.statsGeneration
+        board_ids = self.model.getChangedBoardIdsSince(self.generation)
+        self.refresh(board_ids)
+        self.generation = generation
+        return len(board_ids)
+
+    def probabilities(self, board_id, whose_turn):
+        """Softmax move probabilities of a board (needs with_probabilities)."""
+        if self.cumulative_probs is None:
+            raise ValueError("This policy was compiled without probabilities")
+        return np.diff(
+            self.cumulative_probs[board_id, TURN_INDEX[whose_turn]], prepend=0.0
+        )
+
+    def choose_move_for_board(self, board_id, whose_turn):
+        """
+        Pick a cell for the player to move on this board.
+
+        Args:
+            board_id: board id in the model's index
+            whose_turn: PLAYER_X or PLAYER_O
+        Returns:
+            cell index, or NO_MOVE if the board has no open cell
+        """
+        turn = TURN_INDEX[whose_turn]
+        if self.mode == POLICY_SOFTMAX:
+            cumulative = self.cumulative_probs[board_id, turn]
+            if cumulative[-1] == 0:
+                return NO_MOVE
+            # side="right" never picks a cell whose probability is 0
+            cell = np.searchsorted(
+                cumulative, self.rng.random() * cumulative[-1], side="right"
+            )
+            return int(min(cell, self.num_cells - 1))
+        if self.mode == POLICY_EPSILON_GREEDY and self.rng.random() < self.epsilon:
+            open_cells = np.nonzero(self.model.id2cells[board_id] == CODE_EMPTY)[0]
+            if len(open_cells) == 0:
+                return NO_MOVE
+            return int(self.rng.choice(open_cells))
+        return int(self.best_move[board_id, turn])
+
+    def choose_move(self, game):
+        """
+        choose_move_for_board on the game's current board, as (row, col) for the game
+        engines. Raises ValueError if the board has no open cell.
+        """
+        board_id = self.model.getBoardIdForGame(game)
+        cell = self.choose_move_for_board(board_id, game.next_player)
+        if cell == NO_MOVE:
+            raise ValueError("No open positions available")
+        return (cell // game.size, cell % game.size)
@@ -0,0 +1,16 @@
+"""
+Process pool settings shared by the multiprocess runners (training.py, arena.py).
+"""
+
+import multiprocessing as mp
+
+
+def pool_context():
+    """
+    Multiprocessing context for worker pools: fork where the platform supports it, so the
+    workers inherit the driver's model and agents without pickling them; the platform's
+    default start method otherwise.
+    """
+    if "fork" in mp.get_all_start_methods():
+        return mp.get_context("fork")
+    return mp.get_context()
@@ -0,0 +1,244 @@
+"""
+Temporal-difference (TD(lambda) / Q-learning) training.
+
+Instead of counting outcomes per move, a float32 Q-table learns the value of every move for
+the player making it: Q[row, turn, move] is the expected result (+1 win, 0 draw, -1 loss)
+of playing `move` on the board in `row`. Rows are the model's board index (canonical rows
+when the model uses symmetry), like TicTacToeModel.stats.
+
+Training plays batches of self-play games with the BatchSimulator (epsilon-greedy on the
+current Q values) and updates every move of the batch at once from its lambda-return:
+- the last move of a game gets the game's result
+- any other move gets (1 - lambda) * -max Q(next board) + lambda * -(return of the next
+  move): the next board belongs to the opponent, so its value is negated (negamax)
+lambda = 0 is one-step Q-learning, lambda = 1 is the Monte Carlo game result.
+Moves that occur several times in a batch (the first move of every game, for example) are
+moved towards the mean of their targets, so the step size does not grow with the batch.
+"""
+
+import time
+import numpy as np
+from config import (
+    QLEARNING_LEARNING_RATE,
+    QLEARNING_EPSILON,
+    QLEARNING_LAMBDA,
+    QLEARNING_BATCH_SIZE,
+)
+from board_geometry import CODE_EMPTY
+from model import TURN_INDEX, OUTCOME_DRAW
+from simulator import BatchSimulator
+from checkpoint import write_arrays, read_arrays, check_header, CHECKPOINT_KIND_QTABLE
+
+Q_DTYPE = np.float32
+
+
+def linear_schedule(start, end, num_games):
+    """Value that moves linearly from start to end over num_games games, then stays."""
+
+    def schedule(games_played):
+        fraction = min(games_played / num_games, 1.0)
+        return start + (end - start) * fraction
+
+    return schedule
+
+
+def exponential_schedule(start, end, half_life_games):
+    """Value that decays from start towards end, halving the gap every half_life_games."""
+
+    def schedule(games_played):
+        return end + (start - end) * 0.5 ** (games_played / half_life_games)
+
+    return schedule
+
+
+def _as_schedule(value):
+    return value if callable(value) else (lambda games_played: value)
+
+
+class QLearner:
+    def __init__(self, model, seed=None):
+        """
+        Args:
+            model: TicTacToeModel providing the board index (its stats are not used)
+            seed: seed for self-play
+        """
+        self.model = model
+        self.num_cells = model.totalCellsOnBoard
+        self.q = np.zeros(model.statsShape()[:2] + (self.num_cells,), dtype=Q_DTYPE)
+        self.simulator = BatchSimulator(model, seed=seed)
+        self.games_played = 0
+
+    def _rows_and_moves(self, board_ids, moves):
+        """Translate board ids / moves to Q-table rows / moves (through symmetry)."""
+        if self.model.useSymmetry:
+            return (
+                self.model.canonicalRow[board_ids],
+                self.model.moveToCanonical[board_ids, moves],
+            )
+        return board_ids, moves
+
+    def getQValuesForBoardIds(self, board_ids, turns):
+        """
+        Q value of every move for the player to move, in board orientation.
+        Occupied cells are not masked here. Usable as a BatchSimulator score_fn.
+
+        Returns:
+            float32 array of shape (len(board_ids), moves)
+        """
+        board_ids = np.asarray(board_ids, dtype=np.intp)
+        turns = np.asarray(turns, dtype=np.intp)
+        if self.model.useSymmetry:
+            rows = self.model.canonicalRow[board_ids]
+            return np.take_along_axis(
+                self.q[rows, turns],
+                self.model.moveToCanonical[board_ids].astype(np.intp),
+                axis=1,
+            )
+        return self.q[board_ids, turns]
+
+    def _best_values(self, board_ids, turns):
+        """max over legal moves of Q, for the player to move (0 on boards without moves)."""
+        values = self.getQValuesForBoardIds(board_ids, turns)
+        legal = self.model.id2cells[board_ids] == CODE_EMPTY
+        best = np.where(legal, values, -np.inf).max(axis=1)
+        return np.where(legal.any(axis=1), best, 0.0)
+
+    def update(self, batch, learning_rate, lam=QLEARNING_LAMBDA):
+        """
+        Apply one TD(lambda) update from a GameBatch of finished games.
+
+        Args:
+            batch: simulator.GameBatch with board ids from this learner's model
+            learning_rate: step size towards the lambda-return
+            lam: lambda in [0, 1]
+        """
+        num_games, max_moves = batch.moves.shape
+        board_ids = batch.board_ids.astype(np.intp)
+        moves = batch.moves.astype(np.intp)
+        players = batch.players.astype(np.intp)
+        lengths = batch.lengths.astype(np.intp)
+        winners = batch.winners.astype(np.intp)
+
+        # result of each game for each mover: +1 win, 0 draw, -1 loss
+        results = np.where(
+            winners[:, None] == OUTCOME_DRAW,
+            0.0,
+            np.where(players == winners[:, None], 1.0, -1.0),
+        )
+        targets = np.zeros((num_games, max_moves))
+        # lambda-returns, computed backwards; `following` holds the returns of move t + 1
+        following = np.zeros(num_games)
+        for t in range(max_moves - 1, -1, -1):
+            # the last move of a game gets its result (padding columns are never read)
+            target = results[:, t].copy()
+            inner = t < lengths - 1
+            if inner.any():
+                bootstrap = -self._best_values(
+                    board_ids[inner, t + 1], players[inner, t + 1]
+                )
+                target[inner] = (1 - lam) * bootstrap - lam * following[inner]
+            targets[:, t] = target
+            following = target
+
+        valid = np.arange(max_moves) < lengths[:, None]
+        rows, table_moves = self._rows_and_moves(board_ids[valid], moves[valid])
+        turns = players[valid]
+        flat = (rows * len(TURN_INDEX) + turns) * self.num_cells + table_moves
+        # average the TD errors of repeated entries, then take one step per entry
+        entries, inverse, counts = np.unique(
+            flat, return_inverse=True, return_counts=True
+        )
+        q_flat = self.q.reshape(-1)
+        errors = targets[valid] - q_flat[flat]
+        mean_errors = np.bincount(inverse, weights=errors) / counts
+        q_flat[entries] += (learning_rate * mean_errors).astype(Q_DTYPE)
+
+    def train(
+        self,
+        num_games,
+        learning_rate=QLEARNING_LEARNING_RATE,
+        epsilon=QLEARNING_EPSILON,
+        lam=QLEARNING_LAMBDA,
+        batch_size=QLEARNING_BATCH_SIZE,
+    ):
+        """
+        Self-play num_games games in batches, updating Q after each batch.
+
+        Args:
+            num_games: games to play
+            learning_rate: number, or schedule(games_played) -> number
+                (see linear_schedule / exponential_schedule)
+            epsilon: exploration probability, number or schedule
+            lam: lambda of TD(lambda)
+            batch_size: games per batch (and per update)
+        Returns:
+            dict with games, seconds and games_per_sec
+        """
+        learning_rate = _as_schedule(learning_rate)
+        epsilon = _as_schedule(epsilon)
+        start = time.perf_counter()
+        remaining = num_games
+        while remaining > 0:
+            games = min(batch_size, remaining)
+            batch = self.simulator.run(
+                games,
+                policy=self.getQValuesForBoardIds,
+                epsilon=epsilon(self.games_played),
+            )
+            self.update(batch, learning_rate(self.games_played), lam)
+            self.games_played += games
+            remaining -= games
+        seconds = time.perf_counter() - start
+        return {
+            "games": num_games,
+            "seconds": seconds,
+            "games_per_sec": num_games / seconds if seconds > 0 else float("inf"),
+        }
+
+    def choose_move(self, game):
+        """
+        (row, col) of the open cell with the highest Q value for the player to move; ties
+        go to the lowest cell. Raises ValueError if no cell is open.
+        """
+        board_id = self.model.getBoardIdForGame(game)
+        values = self.getQValuesForBoardIds([board_id], [TURN_INDEX[game.next_player]])[
+            0
+        ]
+        values = np.where(self.model.id2cells[board_id] == CODE_EMPTY, values, -np.inf)
+        if np.isneginf(values).all():
+            raise ValueError("No open positions available")
+        cell = int(np.argmax(values))
+        return (cell // game.size, cell % game.size)
+
+    def save(self, path):
+        """Atomically write the Q-table in the checkpoint file format."""
+        write_arrays(path, CHECKPOINT_KIND_QTABLE, self.model, {"q": self.q})
+
+    def load(self, path, mmap_mode="c"):
+        """
+        Map a Q-table written by save(). The default copy-on-write mode allows training on
+        without modifying the file.
+        """
+        header, arrays = read_arrays(path, mmap_mode)
+        check_header(header, self.model, CHECKPOINT_KIND_QTABLE)
+        if arrays["q"].shape != self.q.shape:
+            raise ValueError(
+                f"Q-table shape {arrays['q'].shape} does not match the model's {self.q.shape}"
+            )
+        self.q = arrays["q"]
+
+
+if __name__ == "__main__":
+    from model import TicTacToeModel
+    from config import BOARD_INDEX_REACHABLE
+
+    learner = QLearner(TicTacToeModel(board_index_mode=BOARD_INDEX_REACHABLE), seed=0)
+    report = learner.train(
+        200_000,
+        learning_rate=linear_schedule(0.5, 0.1, 200_000),
+        epsilon=linear_schedule(0.3, 0.1, 200_000),
+    )
+    print(
+        f"Trained on {report['games']:,} games in {report['seconds']:.1f}s "
+        f"({report['games_per_sec']:,.0f} games/sec)"
+    )
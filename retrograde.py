@@ -0,0 +1,76 @@
+"""
+Retrograde (backward-induction) solver.
+
+Instead of searching forward from the empty board, every board of the model's index is
+labelled level by level, from full boards down to the empty board (a level is the number of
+pieces on the board). All children of a level-L board are on level L + 1, which is already
+solved, so each level is one vectorized step: children are read from the model's transition
+table (TicTacToeModel.nextId, built on first use), and their values are gathered in bulk.
+The whole table is solved in a single linear pass, without recursion.
+
+The results use the same tables as solver.PerfectSolver (values and best_moves per board
+id) and are saved in the checkpoint file format with PerfectSolver.save.
+"""
+
+import numpy as np
+from board_geometry import CODE_EMPTY
+from model import OUTCOME_DRAW, NO_BOARD, NO_SIDE
+from solver import PerfectSolver, VALUE_LOSS, VALUE_DRAW, VALUE_UNKNOWN
+
+
+class RetrogradeSolver(PerfectSolver):
+    """
+    Drop-in replacement for PerfectSolver that solves by backward induction.
+    Boards that cannot occur in a legal game (only present in the full index) stay
+    VALUE_UNKNOWN.
+    """
+
+    def solve(self):
+        model = self.model
+        model.buildTransitionTables()
+        levels = (model.id2cells != CODE_EMPTY).sum(axis=1)
+        valid = model.sideToMove != NO_SIDE
+
+        self.values[:] = VALUE_UNKNOWN
+        self.best_moves[:] = 0
+        for level in range(self.num_cells, -1, -1):
+            board_ids = np.nonzero(valid & (levels == level))[0]
+            if len(board_ids) == 0:
+                continue
+            # a won game is lost for the player to move; a full board is a draw
+            terminal = model.boardTerminal[board_ids]
+            draw = model.boardWinner[board_ids] == OUTCOME_DRAW
+            self.values[board_ids[terminal & ~draw]] = VALUE_LOSS
+            self.values[board_ids[draw]] = VALUE_DRAW
+            board_ids = board_ids[~terminal]
+            if len(board_ids) == 0:
+                continue
+
+            # value of every move for the player to move; illegal moves get a value
+            # below any real one
+            children = model.nextId[board_ids]
+            legal = children != NO_BOARD
+            move_values = np.where(
+                legal, -self.values[np.where(legal, children, 0)], VALUE_UNKNOWN
+            ).astype(np.int8)
+            values = move_values.max(axis=1)
+            self.values[board_ids] = values
+            optimal = move_values == values[:, None]
+            self.best_moves[board_ids] = (
+                optimal.astype(np.uint16) << np.arange(self.num_cells, dtype=np.uint16)
+            ).sum(axis=1, dtype=np.uint16)
+
+
+if __name__ == "__main__":
+    import time
+    from model import TicTacToeModel
+    from config import BOARD_INDEX_REACHABLE
+
+    model = TicTacToeModel(board_index_mode=BOARD_INDEX_REACHABLE)
+    start = time.perf_counter()
+    solver = RetrogradeSolver(model)
+    seconds = time.perf_counter() - start
+    print(
+        f"Solved {int((solver.values != VALUE_UNKNOWN).sum())} boards in {seconds:.3f}s"
+    )
+    solver.save("solved.ckpt")
@@ -0,0 +1,156 @@
+"""
+Stats store backed by multiprocessing.shared_memory.
+Several self-play processes can add to one TicTacToeModel stats array in place, and readers
+(a policy server, an evaluator) can attach to a live training run by name without a copy.
+
+Layout of the shared block: a 64-byte header (magic, version, dtype, shape) followed by the
+raw stats array, so attach() only needs the block name.
+
+Contention control: the rows of the table are split into contiguous stripes, one lock per
+stripe. Writers accumulate a batch of games in a private shard and then add it stripe by
+stripe, holding only that stripe's lock. Readers never lock; a reader may see a stripe that
+is half-way through an update.
+"""
+
+import struct
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+SHARED_STATS_MAGIC = b"T3SH"
+SHARED_STATS_VERSION = 1
+# magic, version, dtype string, ndim, then up to 4 dimensions
+_HEADER_FORMAT = "<4sI8sI4Q"
+HEADER_SIZE = 64
+
+
+class SharedStatsTable:
+    def __init__(self, shm, shape, dtype, locks=None, owner=False):
+        """
+        Use SharedStatsTable.create / from_model / attach instead of calling this directly.
+        """
+        self.shm = shm
+        self.owner = owner
+        self.locks = locks
+        self.array = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=HEADER_SIZE)
+
+    @classmethod
+    def create(cls, shape, dtype, num_stripes=64, name=None):
+        """
+        Allocate a zeroed shared table.
+
+        Args:
+            shape: shape of the stats array (up to 4 dimensions)
+            dtype: dtype of the stats array
+            num_stripes: number of row stripes, each with its own lock
+            name: optional name for the shared memory block
+        """
+        dtype = np.dtype(dtype)
+        if len(shape) > 4:
+            raise ValueError(
+                f"Invalid shape: {shape}. At most 4 dimensions are supported"
+            )
+        size = HEADER_SIZE + int(np.prod(shape)) * dtype.itemsize
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        dims = list(shape) + [0] * (4 - len(shape))
+        struct.pack_into(
+            _HEADER_FORMAT,
+            shm.buf,
+            0,
+            SHARED_STATS_MAGIC,
+            SHARED_STATS_VERSION,
+            dtype.str.encode(),
+            len(shape),
+            *dims,
+        )
+        locks = [mp.Lock() for _ in range(max(1, min(num_stripes, shape[0])))]
+        table = cls(shm, shape, dtype, locks=locks, owner=True)
+        table.array[...] = 0
+        return table
+
+    @classmethod
+    def from_model(cls, model, num_stripes=64, name=None):
+        """
+        Move a model's stats into a new shared table: the current stats are copied in and
+        model.stats is rebound to the shared array.
+        """
+        table = cls.create(model.stats.shape, model.stats.dtype, num_stripes, name)
+        table.array[...] = model.stats
+        table.bind(model)
+        return table
+
+    @classmethod
+    def attach(cls, name, locks=None):
+        """
+        Attach to an existing table by name, without copying it.
+
+        Args:
+            name: name of the shared memory block (SharedStatsTable.name of the creator)
+            locks: the creator's stripe locks, needed only to write with add_shard
+        """
+        # the creator owns the block; attaching must not unlink it when this process exits
+        shm = shared_memory.SharedMemory(name=name, track=False)
+        magic, version, dtype, ndim, *dims = struct.unpack_from(
+            _HEADER_FORMAT, shm.buf, 0
+        )
+        if magic != SHARED_STATS_MAGIC or version != SHARED_STATS_VERSION:
+            shm.close()
+            raise ValueError(f"Shared memory block {name} is not a stats table")
+        dtype = np.dtype(dtype.rstrip(b"\0").decode())
+        return cls(shm, tuple(dims[:ndim]), dtype, locks=locks)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def bind(self, model):
+        """Point model.stats at the shared array (shapes must match)."""
+        if model.stats is not None and model.stats.shape != self.array.shape:
+            raise ValueError(
+                f"Invalid model stats shape: {model.stats.shape}. Expected {self.array.shape}"
+            )
+        model.stats = self.array
+        model.markStatsChanged()
+
+    def unbind(self, model):
+        """Give the model a private copy of the shared stats, so the table can be closed."""
+        model.stats = self.array.copy()
+
+    def stripe_bounds(self):
+        """(first_row, end_row) of every stripe."""
+        num_rows = self.array.shape[0]
+        edges = np.linspace(0, num_rows, len(self.locks) + 1).astype(int)
+        return list(zip(edges[:-1], edges[1:]))
+
+    def add_shard(self, shard):
+        """
+        Add a private shard (an array shaped like the table) into the table in place.
+        Only stripes the shard touches are locked and written.
+        """
+        if self.locks is None:
+            raise ValueError("This table was attached without locks and is read-only")
+        touched_rows = shard.reshape(shard.shape[0], -1).any(axis=1)
+        for lock, (first, end) in zip(self.locks, self.stripe_bounds()):
+            if not touched_rows[first:end].any():
+                continue
+            with lock:
+                self.array[first:end] += shard[first:end]
+
+    def close(self):
+        """
+        Detach from the block. Nothing may still reference the array (unbind models first).
+        """
+        self.array = None
+        self.shm.close()
+
+    def unlink(self):
+        """Free the block. Only the creator should call this, after every user has closed."""
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        self.unlink()
@@ -0,0 +1,234 @@
+"""
+Batched self-play simulator.
+Plays thousands of games in lockstep over an (N, cells) NumPy board array: every ply picks
+a move for all unfinished games at once and checks wins with one vectorized line test.
+Histories come out in the (board_id, move, who_moved) format used by TicTacToeModel.
+"""
+
+import numpy as np
+from config import (
+    TIC_TAC_TOE_SIZE,
+    PLAYER_X,
+    PLAYER_O,
+    GAME_WINNER_DRAW,
+    DENSE_BOARD_INDEX_MODES,
+)
+from board_geometry import (
+    win_lines,
+    code_weights,
+    move_dtype,
+    resolve_win_length,
+    CODE_EMPTY,
+)
+from model import OUTCOME_DRAW, NO_WINNER
+
+# move selection policies for BatchSimulator.run
+POLICY_RANDOM = "random"  # uniformly random legal moves
+POLICY_MODEL = "model"  # best move by TicTacToeModel stats, with epsilon exploration
+
+# player / winner codes used in the batch arrays (TURN_INDEX codes, plus OUTCOME_DRAW)
+PLAYER_BY_CODE = (PLAYER_X, PLAYER_O)
+WINNER_BY_CODE = (PLAYER_X, PLAYER_O, GAME_WINNER_DRAW)
+
+
+class GameBatch:
+    """
+    Move records of a batch of finished games. Per-game arrays are padded to one column
+    per cell; only the first lengths[g] columns of game g are meaningful.
+
+    Attributes:
+        board_ids: (N, cells) board id before each move (-1 in padding)
+        moves: (N, cells) cell index of each move
+        players: (N, cells) mover of each move (0 = X, 1 = O)
+        lengths: (N,) number of moves in each game
+        winners: (N,) winner of each game (0 = X, 1 = O, OUTCOME_DRAW = draw)
+    """
+
+    def __init__(self, board_ids, moves, players, lengths, winners):
+        self.board_ids = board_ids
+        self.moves = moves
+        self.players = players
+        self.lengths = lengths
+        self.winners = winners
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def rows(self):
+        """
+        Flatten the batch into one row per move.
+
+        Returns:
+            (board_ids, moves, players, winners), equal-length 1D arrays
+        """
+        valid = np.arange(self.moves.shape[1]) < self.lengths[:, None]
+        return (
+            self.board_ids[valid],
+            self.moves[valid],
+            self.players[valid],
+            np.repeat(self.winners, self.lengths),
+        )
+
+    def histories(self):
+        """
+        Yield (history, who_won) per game, in the format of
+        TicTacToeModel.setMoveStatsForEntireGameFromHistory.
+        """
+        for g in range(len(self)):
+            length = self.lengths[g]
+            history = [
+                (int(board_id), int(move), PLAYER_BY_CODE[player])
+                for board_id, move, player in zip(
+                    self.board_ids[g, :length],
+                    self.moves[g, :length],
+                    self.players[g, :length],
+                )
+            ]
+            yield history, WINNER_BY_CODE[self.winners[g]]
+
+    def apply_to(self, model, stats=None, weight=1):
+        """
+        Add every game of the batch to the model's stats in one bulk update.
+
+        Args:
+            model: TicTacToeModel the board ids belong to
+            stats: optional array shaped like model.stats to accumulate into instead of the
+                model's own store (e.g. a training shard)
+            weight: how much each game counts (a positive integer)
+        """
+        board_ids, moves, players, winners = self.rows()
+        model.setMoveStatsFromBatch(
+            board_ids, moves, players, winners, weight=weight, stats=stats
+        )
+
+
+class BatchSimulator:
+    def __init__(self, model=None, size=TIC_TAC_TOE_SIZE, seed=None, win_length=None):
+        """
+        Args:
+            model: optional TicTacToeModel with a dense board index. Needed for
+                POLICY_MODEL; when given, recorded board ids are the model's ids
+                (otherwise raw base-3 board codes)
+            size: board size
+            seed: seed for the random generator (same seed, same games)
+            win_length: pieces in a row needed to win (see board_geometry.win_lines)
+        """
+        if model is not None and model.boardIndexMode not in DENSE_BOARD_INDEX_MODES:
+            raise ValueError("BatchSimulator needs a model with a dense board index")
+        if 3 ** (size * size) - 1 > np.iinfo(np.int64).max:
+            raise ValueError(
+                f"Board codes of {size}x{size} boards do not fit in 64 bits; "
+                f"BatchSimulator supports boards up to 6x6"
+            )
+        self.model = model
+        self.size = size
+        self.num_cells = size * size
+        self.lines = np.array(win_lines(size, win_length), dtype=np.intp)
+        self.weights = np.array(code_weights(size), dtype=np.int64)
+        # raw codes of larger boards do not fit in int32 board ids
+        if model is None and 3 ** (size * size) - 1 > np.iinfo(np.int32).max:
+            self.board_id_dtype = np.int64
+        else:
+            self.board_id_dtype = np.int32
+        # the model's transition table (when built) can be followed instead of placing
+        # pieces and checking lines, if it was built for the same rules
+        self.rules_match_model = (
+            model is not None
+            and size == TIC_TAC_TOE_SIZE
+            and resolve_win_length(size, win_length)
+            == resolve_win_length(TIC_TAC_TOE_SIZE)
+        )
+        self.rng = np.random.default_rng(seed)
+
+    def run(self, num_games, policy=POLICY_RANDOM, epsilon=0.1):
+        """
+        Play num_games games to the end, all in lockstep.
+
+        Args:
+            num_games: number of games in the batch
+            policy: POLICY_RANDOM, POLICY_MODEL, or a callable
+                score_fn(board_ids, turns) -> (k, cells) array of move scores; the highest
+                scoring legal move is played
+            epsilon: probability of a uniformly random legal move instead of the policy's
+                choice (ignored for POLICY_RANDOM)
+        Returns:
+            GameBatch
+        """
+        if policy == POLICY_MODEL:
+            if self.model is None:
+                raise ValueError("POLICY_MODEL needs a model")
+            score_fn = self.model.getMoveScoresForBoardIds
+        elif policy == POLICY_RANDOM:
+            score_fn = None
+        elif callable(policy):
+            score_fn = policy
+        else:
+            raise ValueError(
+                f"Invalid policy: {policy}. Expected POLICY_RANDOM, POLICY_MODEL or a callable"
+            )
+
+        cells = self.num_cells
+        use_transitions = self.rules_match_model and self.model.nextId is not None
+        if use_transitions:
+            # only the current board id of each game is tracked
+            ids = np.full(num_games, self.model.code2id[3**cells - 1], dtype=np.int64)
+        else:
+            boards = np.full((num_games, cells), CODE_EMPTY, dtype=np.int8)
+            codes = np.full(num_games, 3**cells - 1, dtype=np.int64)
+        active = np.ones(num_games, dtype=bool)
+
+        board_ids = np.full((num_games, cells), -1, dtype=self.board_id_dtype)
+        moves = np.zeros((num_games, cells), dtype=move_dtype(self.size))
+        players = np.zeros((num_games, cells), dtype=np.int8)
+        lengths = np.zeros(num_games, dtype=move_dtype(self.size))
+        winners = np.full(num_games, OUTCOME_DRAW, dtype=np.int8)
+
+        for ply in range(cells):
+            games = np.nonzero(active)[0]
+            if games.size == 0:
+                break
+            # players alternate, and every unfinished game is at the same ply
+            player = ply % 2
+            if use_transitions:
+                current_ids = ids[games]
+                occupied = self.model.id2cells[current_ids] != CODE_EMPTY
+            else:
+                current_boards = boards[games]
+                if self.model is not None:
+                    current_ids = self.model.code2id[codes[games]]
+                else:
+                    current_ids = codes[games]
+                occupied = current_boards != CODE_EMPTY
+
+            # random keys break ties and drive exploration; occupied cells never win
+            keys = self.rng.random((games.size, cells))
+            if score_fn is not None:
+                turns = np.full(games.size, player, dtype=np.intp)
+                scores = np.asarray(score_fn(current_ids, turns), dtype=np.float64)
+                explore = self.rng.random(games.size) < epsilon
+                # keys stay in [0, 1), so they only break ties between equal scores
+                keys = np.where(explore[:, None], keys, scores + keys * 1e-9)
+            keys[occupied] = -np.inf
+            chosen = np.argmax(keys, axis=1)
+
+            board_ids[games, ply] = current_ids
+            moves[games, ply] = chosen
+            players[games, ply] = player
+            lengths[games] += 1
+
+            if use_transitions:
+                next_ids = self.model.nextId[current_ids, chosen]
+                ids[games] = next_ids
+                results = self.model.boardWinner[next_ids]
+                won = (results != NO_WINNER) & (results != OUTCOME_DRAW)
+            else:
+                boards[games, chosen] = player
+                codes[games] -= (CODE_EMPTY - player) * self.weights[chosen]
+                # one vectorized line check for the player who just moved
+                owned = boards[games][:, self.lines] == player
+                won = owned.all(axis=2).any(axis=1)
+            winners[games[won]] = player
+            active[games[won]] = False
+
+        # games still active here filled the board without a winner: they stay draws
+        return GameBatch(board_ids, moves, players, lengths, winners)
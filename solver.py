@@ -0,0 +1,185 @@
+"""
+Perfect-play solver over the TicTacToeModel board index.
+
+Every reachable position is solved once with negamax and a transposition table keyed by
+board id (or by canonical board when the model uses symmetry). The results are kept as two
+compact per-board arrays, so looking up the value or the optimal moves of a position is a
+single array index:
+- values[board_id]: game value for the player to move (VALUE_WIN / VALUE_DRAW / VALUE_LOSS),
+  VALUE_UNKNOWN for boards that cannot occur in a legal game
+- best_moves[board_id]: bit mask of every optimal move (bit k set = cell k is optimal)
+"""
+
+import random
+import numpy as np
+from config import TIC_TAC_TOE_SIZE, DENSE_BOARD_INDEX_MODES
+from board_geometry import code_weights, cell_lines, CODE_X, CODE_O, CODE_EMPTY
+from model import TicTacToeModel
+from checkpoint import (
+    write_arrays,
+    read_arrays,
+    check_header,
+    CHECKPOINT_KIND_SOLVED,
+)
+
+VALUE_LOSS = -1
+VALUE_DRAW = 0
+VALUE_WIN = 1
+VALUE_UNKNOWN = -2
+
+
+class PerfectSolver:
+    def __init__(self, model, seed=None, solve=True):
+        """
+        Solve every reachable position of the model's board index.
+
+        Args:
+            model: TicTacToeModel whose board ids the results are indexed by
+            seed: seed for picking between equally good moves in choose_move
+            solve: solve right away; PerfectSolver.load passes False and fills the tables
+                from a file instead
+        """
+        if model.boardIndexMode not in DENSE_BOARD_INDEX_MODES:
+            raise ValueError("PerfectSolver needs a model with a dense board index")
+        self.model = model
+        self.num_cells = TIC_TAC_TOE_SIZE * TIC_TAC_TOE_SIZE
+        self.weights = code_weights(TIC_TAC_TOE_SIZE)
+        self.cell_lines = cell_lines(TIC_TAC_TOE_SIZE)
+        self.rng = random.Random(seed)
+        num_boards = len(model.id2code)
+        self.values = np.full(num_boards, VALUE_UNKNOWN, dtype=np.int8)
+        self.best_moves = np.zeros(num_boards, dtype=np.uint16)
+        if solve:
+            self.solve()
+
+    def _table_keys(self):
+        # symmetric boards share one transposition table entry
+        if self.model.useSymmetry:
+            return self.model.canonicalRow
+        return np.arange(len(self.model.id2code))
+
+    def solve(self):
+        """Fill values and best_moves for every position reachable from the empty board."""
+        keys = self._table_keys()
+        self.keys = keys
+        self.table = np.full(int(keys.max()) + 1, VALUE_UNKNOWN, dtype=np.int8)
+        cells = [CODE_EMPTY] * self.num_cells
+        self._negamax(cells, 3**self.num_cells - 1, CODE_X, None)
+        # boards that were never visited directly (symmetric to a solved one) share its value
+        self.values[:] = self.table[keys]
+        self.table = self.keys = None
+        self._fill_best_moves()
+
+    def _negamax(self, cells, code, player, last_move):
+        """
+        Value of the position for `player` (the player to move).
+        cells is modified in place and restored before returning.
+        """
+        key = self.keys[self.model.code2id[code]]
+        value = int(self.table[key])
+        if value == VALUE_UNKNOWN:
+            opponent = CODE_O if player == CODE_X else CODE_X
+            if last_move is not None and any(
+                all(cells[i] == opponent for i in line)
+                for line in self.cell_lines[last_move]
+            ):
+                value = VALUE_LOSS  # the previous move won the game
+            elif CODE_EMPTY not in cells:
+                value = VALUE_DRAW
+            else:
+                value = VALUE_LOSS
+                for move in range(self.num_cells):
+                    if cells[move] != CODE_EMPTY:
+                        continue
+                    cells[move] = player
+                    child_code = code - (CODE_EMPTY - player) * self.weights[move]
+                    child_value = -self._negamax(cells, child_code, opponent, move)
+                    cells[move] = CODE_EMPTY
+                    # no cutoff: a weaker opponent can reach every child, so all are solved
+                    value = max(value, child_value)
+            self.table[key] = value
+        return value
+
+    def _fill_best_moves(self):
+        """
+        Mark the optimal moves of every solved position, in one vectorized pass:
+        a move is optimal when its child position is worth -value to the opponent.
+        """
+        model = self.model
+        solved = np.nonzero(self.values != VALUE_UNKNOWN)[0]
+        board_cells = model.id2cells[solved]
+        # the player to move: X when both have the same number of pieces
+        x_count = (board_cells == CODE_X).sum(axis=1)
+        o_count = (board_cells == CODE_O).sum(axis=1)
+        players = np.where(x_count == o_count, CODE_X, CODE_O)
+        codes = model.id2code[solved]
+        weights = np.array(self.weights, dtype=np.int64)
+
+        best = np.zeros(len(solved), dtype=np.uint16)
+        for move in range(self.num_cells):
+            legal = board_cells[:, move] == CODE_EMPTY
+            child_codes = codes - (CODE_EMPTY - players) * weights[move]
+            child_ids = model.code2id[np.where(legal, child_codes, codes)]
+            child_values = self.values[child_ids]
+            optimal = (
+                legal
+                & (child_values != VALUE_UNKNOWN)
+                & (-child_values == self.values[solved])
+            )
+            best |= optimal.astype(np.uint16) << move
+        self.best_moves[solved] = best
+
+    def save(self, path):
+        """Atomically write the value and move tables in the checkpoint file format."""
+        write_arrays(
+            path,
+            CHECKPOINT_KIND_SOLVED,
+            self.model,
+            {"values": self.values, "best_moves": self.best_moves},
+        )
+
+    @classmethod
+    def load(cls, path, model=None, seed=None, mmap_mode="r"):
+        """
+        Load tables written by save() by memory-mapping them (no solving on start-up).
+
+        Args:
+            path: file written by save()
+            model: optional TicTacToeModel; by default one is built with the index mode and
+                symmetry setting recorded in the file
+            seed: seed for choose_move
+            mmap_mode: see checkpoint.read_arrays
+        """
+        header, arrays = read_arrays(path, mmap_mode)
+        if model is None:
+            model = TicTacToeModel(
+                board_index_mode=header["index_mode"], use_symmetry=header["symmetry"]
+            )
+        check_header(header, model, CHECKPOINT_KIND_SOLVED)
+        solver = cls(model, seed=seed, solve=False)
+        for name in ("values", "best_moves"):
+            if arrays[name].shape != getattr(solver, name).shape:
+                raise ValueError(
+                    f"Solution {name} shape {arrays[name].shape} does not match the model's {getattr(solver, name).shape}"
+                )
+            setattr(solver, name, arrays[name])
+        return solver
+
+    def value(self, board_id):
+        """Game value for the player to move on this board."""
+        return int(self.values[board_id])
+
+    def optimal_moves(self, board_id):
+        """List of optimal cells for the player to move (empty if the game is over)."""
+        mask = int(self.best_moves[board_id])
+        return [move for move in range(self.num_cells) if mask >> move & 1]
+
+    def choose_move(self, game):
+        """
+        (row, col) of an optimal move for the game's position, drawn at random from the
+        best_moves mask when several moves are equally good. Falls back to a random open
+        cell if the solver sees the position as finished.
+        """
+        moves = self.optimal_moves(self.model.getBoardIdForGame(game))
+        linear_pos = self.rng.choice(moves or game.open_positions)
+        return (linear_pos // game.size, linear_pos % game.size)
@@ -0,0 +1,202 @@
+"""
+Memory-capped stats store keyed by board hash.
+
+Backs TicTacToeModel's "hashed" board index: instead of one stats row per indexed board, a
+fixed pool of slots holds the stats of the boards seen so far, found through a dict from
+64-bit board hash (see zobrist.py) to slot. Entries are created on the first write to a
+board; reading a board that has no entry returns zeros and creates nothing.
+
+The pool is sized from a byte budget and allocated once with np.zeros, so the operating
+system only commits the pages of slots that have been used. When every slot is taken, a
+batch of entries (1/16th of the pool) is evicted at once, chosen by:
+- EVICT_LRU: least recently read or written
+- EVICT_LEAST_VISITED: fewest writes (ties broken by least recently used)
+Entries touched by the current call are never evicted by it.
+
+hits, misses and evictions count lookups that found an entry, lookups that did not, and
+entries evicted.
+"""
+
+import numpy as np
+from config import SPARSE_STATS_MAX_BYTES, SPARSE_STATS_EVICTION
+
+EVICT_LRU = "lru"
+EVICT_LEAST_VISITED = "least_visited"
+EVICTION_POLICIES = (EVICT_LRU, EVICT_LEAST_VISITED)
+
+# keys[slot] of a slot without an entry (hashes are never negative)
+FREE_KEY = -1
+# rough cost of one key -> slot dict item, counted against the memory cap
+_DICT_ITEM_BYTES = 100
+# fraction of the pool evicted when it is full
+_EVICT_FRACTION = 16
+
+
+class SparseStatsStore:
+    def __init__(
+        self,
+        entry_shape,
+        dtype,
+        max_bytes=SPARSE_STATS_MAX_BYTES,
+        eviction=SPARSE_STATS_EVICTION,
+        on_evict=None,
+    ):
+        """
+        Args:
+            entry_shape: shape of one board's stats, (turns, stats, moves)
+            dtype: counter dtype
+            max_bytes: memory cap for the entries and their bookkeeping
+            eviction: EVICT_LRU or EVICT_LEAST_VISITED
+            on_evict: optional callback(slots, keys) called after entries are evicted,
+                with the slots freed and the keys they held (their stats have been zeroed
+                and their keys reset to FREE_KEY by then)
+        """
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(
+                f"Invalid eviction: {eviction}. Expected one of {EVICTION_POLICIES}"
+            )
+        entry_bytes = int(np.prod(entry_shape)) * np.dtype(dtype).itemsize
+        # entries + keys, last_used and visits + the dict item
+        capacity = max_bytes // (entry_bytes + 3 * 8 + _DICT_ITEM_BYTES)
+        if capacity < _EVICT_FRACTION:
+            raise ValueError(
+                f"max_bytes = {max_bytes} holds only {capacity} entries of {entry_bytes} bytes"
+            )
+        self.capacity = int(capacity)
+        self.eviction = eviction
+        self.on_evict = on_evict
+        self.entries = np.zeros((self.capacity,) + tuple(entry_shape), dtype=dtype)
+        self.keys = np.full(self.capacity, FREE_KEY, dtype=np.int64)
+        # clock value of the last read or write, and number of writes, per slot
+        self.last_used = np.zeros(self.capacity, dtype=np.int64)
+        self.visits = np.zeros(self.capacity, dtype=np.int64)
+        self.slots = {}
+        self.free_slots = []
+        # slots below next_slot have been used at least once
+        self.next_slot = 0
+        self.clock = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, key):
+        return key in self.slots
+
+    def counters(self):
+        """Hit/miss/eviction counters and fill level, as a dict."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.slots),
+            "capacity": self.capacity,
+        }
+
+    def find(self, key):
+        """Slot holding the stats of `key`, or -1 if it has no entry."""
+        self.clock += 1
+        slot = self.slots.get(key)
+        if slot is None:
+            self.misses += 1
+            return -1
+        self.hits += 1
+        self.last_used[slot] = self.clock
+        return slot
+
+    def slot_for(self, key):
+        """Slot holding the stats of `key`, creating the entry if needed; counts a write."""
+        self.clock += 1
+        slot = self._lookup_or_add(key)
+        self.visits[slot] += 1
+        return slot
+
+    def slots_for(self, keys):
+        """
+        Vectorized slot_for: slots of many keys (repeats allowed), creating missing entries.
+        Each key counts one write per occurrence.
+
+        Returns:
+            int64 array of slots, shaped like keys
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        unique_keys, inverse, counts = np.unique(
+            keys, return_inverse=True, return_counts=True
+        )
+        if len(unique_keys) > self.capacity - self.capacity // _EVICT_FRACTION:
+            raise ValueError(
+                f"{len(unique_keys)} distinct boards in one update do not fit in the "
+                f"store ({self.capacity} entries)"
+            )
+        self.clock += 1
+        unique_slots = np.fromiter(
+            (self._lookup_or_add(key) for key in unique_keys.tolist()),
+            dtype=np.int64,
+            count=len(unique_keys),
+        )
+        self.visits[unique_slots] += counts
+        return unique_slots[inverse].reshape(keys.shape)
+
+    def gather(self, keys):
+        """
+        Copy of the stats of many keys; keys without an entry read as zeros.
+
+        Returns:
+            array of shape keys.shape + entry_shape
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        unique_slots = np.fromiter(
+            (self.find(key) for key in unique_keys.tolist()),
+            dtype=np.int64,
+            count=len(unique_keys),
+        )
+        slots = unique_slots[inverse].reshape(keys.shape)
+        found = slots >= 0
+        stats = np.zeros(keys.shape + self.entries.shape[1:], dtype=self.entries.dtype)
+        stats[found] = self.entries[slots[found]]
+        return stats
+
+    def _lookup_or_add(self, key):
+        slot = self.slots.get(key)
+        if slot is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            if not self.free_slots and self.next_slot == self.capacity:
+                self._evict()
+            if self.free_slots:
+                slot = self.free_slots.pop()
+            else:
+                slot = self.next_slot
+                self.next_slot += 1
+            self.slots[key] = slot
+            self.keys[slot] = key
+            self.visits[slot] = 0
+        self.last_used[slot] = self.clock
+        return slot
+
+    def _evict(self):
+        """Free a batch of entries, sparing the ones touched during the current call."""
+        candidates = np.nonzero(self.last_used < self.clock)[0]
+        count = min(max(1, self.capacity // _EVICT_FRACTION), len(candidates))
+        if count == 0:
+            raise ValueError("Every entry of the store is in use by the current update")
+        if self.eviction == EVICT_LRU:
+            order = np.argpartition(self.last_used[candidates], count - 1)
+        else:
+            # fewest visits first, then least recently used
+            order = np.lexsort((self.last_used[candidates], self.visits[candidates]))
+        victims = candidates[order[:count]]
+        evicted_keys = self.keys[victims]
+        for key in evicted_keys.tolist():
+            del self.slots[key]
+        self.keys[victims] = FREE_KEY
+        self.entries[victims] = 0
+        self.visits[victims] = 0
+        self.free_slots.extend(victims.tolist())
+        self.evictions += count
+        if self.on_evict is not None:
+            self.on_evict(victims, evicted_keys)
@@ -0,0 +1,57 @@
+"""
+The 8 symmetries (dihedral group D4) of a square board, as cell permutations.
+
+A transform is a tuple `perm` with one entry per cell, such that the transformed board is
+    transformed[i] = board[perm[i]]
+so a move played on cell m of the original board lands on cell inverse_perm[m] of the
+transformed board.
+"""
+
+from functools import lru_cache
+from config import TIC_TAC_TOE_SIZE
+
+
+@lru_cache(maxsize=None)
+def board_transforms(size=TIC_TAC_TOE_SIZE):
+    """
+    All 8 transforms of a size x size board, identity first.
+
+    Returns:
+        tuple of 8 permutations (tuples of cell indices)
+    """
+    last = size - 1
+    # each entry maps a (row, col) of the transformed board to the source (row, col)
+    sources = [
+        lambda r, c: (r, c),  # identity
+        lambda r, c: (last - c, r),  # rotate 90
+        lambda r, c: (last - r, last - c),  # rotate 180
+        lambda r, c: (c, last - r),  # rotate 270
+        lambda r, c: (r, last - c),  # mirror left/right
+        lambda r, c: (last - r, c),  # mirror top/bottom
+        lambda r, c: (c, r),  # transpose (main diagonal)
+        lambda r, c: (last - c, last - r),  # anti-diagonal
+    ]
+    transforms = []
+    for source in sources:
+        perm = []
+        for r in range(size):
+            for c in range(size):
+                src_r, src_c = source(r, c)
+                perm.append(src_r * size + src_c)
+        transforms.append(tuple(perm))
+    return tuple(transforms)
+
+
+@lru_cache(maxsize=None)
+def inverse_board_transforms(size=TIC_TAC_TOE_SIZE):
+    """
+    Inverse of every transform in board_transforms(size), in the same order.
+    inverse[m] is where cell m of the original board ends up after the transform.
+    """
+    inverses = []
+    for perm in board_transforms(size):
+        inverse = [0] * len(perm)
+        for i, src in enumerate(perm):
+            inverse[src] = i
+        inverses.append(tuple(inverse))
+    return tuple(inverses)
@@ -11,6 +11,15 @@ from config import (
     GAME_WINNER_NONE as STRING_WINNER_NONE,
     TIC_TAC_TOE_SIZE,
 )
+from board_geometry import (
+    code_weights,
+    win_lines,
+    cell_line_indices,
+    resolve_win_length,
+    CODE_EMPTY,
+    CELL_CODES,
+)
+from zobrist import zobrist_keys, zobrist_side_key
 
 
 class WrongMoveError(Exception):
@@ -21,9 +30,19 @@ class WrongMoveError(Exception):
 
 class TicTacToe:
     # init function that will create the following attributes.
-    def __init__(self, size=TIC_TAC_TOE_SIZE):
+    def __init__(self, size=TIC_TAC_TOE_SIZE, win_length=None):
         # board size:
         self.size = size
+        # winning lines (runs of win_length cells, the full width by default), as tuples of
+        # linear cell indices
+        self.win_lines = win_lines(size, win_length)
+        self.win_length = resolve_win_length(size, win_length)
+        # for every cell, the indices (in win_lines) of the lines through it, and for each
+        # player (by cell code) the number of cells it owns on every line: a move only
+        # updates the lines through its cell, and a line whose count reaches win_length
+        # is complete
+        self.cell_line_indices = cell_line_indices(size, win_length)
+        self.line_counts = [[0] * len(self.win_lines) for _ in range(2)]
         # board:
         # - A good data structure to store the tictactoe board is a 2D list (list of lists), where each element represents a cell on the board.
         #   A string representation of the board can be created by joining the elements of the 2D list with a delimiter.
@@ -34,10 +53,24 @@ class TicTacToe:
         self.winner = None  # None (if game is not over), STRING_X, or STRING_O, or DRAW (if game is a draw)
         # is game over:
         self.is_game_over = False
-        # open positions:
+        # open positions (in no particular order: a move swaps the last entry into the
+        # played cell's place, so make_move and unmake_move both update it in O(1)):
         self.open_positions = [i for i in range(size * size)]
+        # index of every open cell in open_positions
+        self.open_index = [i for i in range(size * size)]
         # move count:
         self.move_count = 0
+        # base-3 board code (the board id in the model's full enumeration),
+        # updated on every move so no board string has to be built for a lookup
+        self.code_weights = code_weights(size)
+        self.board_code = 3 ** (size * size) - 1
+        # Zobrist hash of the position (see zobrist.py), updated with two XORs per move
+        self.zobrist_keys = zobrist_keys(size)
+        self.zobrist_side_key = zobrist_side_key(size)
+        self.zobrist_hash = 0
+        # one (cell, index it had in open_positions, winner before the move) entry per
+        # move played, for unmake_move
+        self.move_stack = []
 
     # print the board to the console:
     def print_board(self):
@@ -57,44 +90,95 @@ class TicTacToe:
                 f"Turn mismatch. Expected: {self.next_player}, but got: {whose_turn}"
             )
 
+        position = row * self.size + col
+        self.move_stack.append((position, self.open_index[position], self.winner))
         self.board[row][col] = self.next_player
-        self.open_positions.remove(row * self.size + col)
+        # swap-remove the cell from open_positions
+        index = self.open_index[position]
+        last = self.open_positions.pop()
+        if last != position:
+            self.open_positions[index] = last
+            self.open_index[last] = index
+        self.board_code -= (CODE_EMPTY - CELL_CODES[self.next_player]) * (
+            self.code_weights[position]
+        )
+        self.zobrist_hash ^= (
+            self.zobrist_keys[position][CELL_CODES[self.next_player]]
+            ^ self.zobrist_side_key
+        )
 
-        # move the turn to the next player
-        self.next_player = STRING_O if self.next_player == STRING_X else STRING_X
-        # see if anybody has won the game
-        self.winner = self.check_win()
-        # update self.is_game_over
-        self.is_game_over = self.winner is not None
         # update move count
         self.move_count += 1
+        # see if the move completed a line or filled the board; only the lines through
+        # the played cell can change (a result, once set, stays)
+        counts = self.line_counts[CELL_CODES[self.next_player]]
+        completed_line = False
+        for line in self.cell_line_indices[position]:
+            counts[line] += 1
+            if counts[line] == self.win_length:
+                completed_line = True
+        if self.winner is None:
+            if completed_line:
+                self.winner = self.next_player
+            elif self.move_count == self.size * self.size:
+                self.winner = STRING_WINNER_DRAW
+        # update self.is_game_over
+        self.is_game_over = self.winner is not None
+        # move the turn to the next player
+        self.next_player = STRING_O if self.next_player == STRING_X else STRING_X
         return self.winner
 
-    def check_win(self):
-        # check if the game is over:
-        # first, check if there is any valid moves remaining
+    # take back the last move in O(1), restoring every attribute make_move changed:
+    # return the (row, col) of the move that was undone
+    def unmake_move(self):
+        if not self.move_stack:
+            raise WrongMoveError("No move to undo")
+        position, index, winner = self.move_stack.pop()
+        row, col = divmod(position, self.size)
+        # the player who made the move is the one not to move now
+        player = STRING_O if self.next_player == STRING_X else STRING_X
+        self.board[row][col] = STRING_EMPTY
+        counts = self.line_counts[CELL_CODES[player]]
+        for line in self.cell_line_indices[position]:
+            counts[line] -= 1
+        # undo the swap-remove: the cell goes back to its index, the entry that took
+        # its place back to the end
+        self.open_positions.append(position)
+        moved = self.open_positions[index]
+        self.open_positions[index] = position
+        self.open_positions[-1] = moved
+        self.open_index[moved] = len(self.open_positions) - 1
+        self.open_index[position] = index
+        self.board_code += (CODE_EMPTY - CELL_CODES[player]) * (
+            self.code_weights[position]
+        )
+        self.zobrist_hash ^= (
+            self.zobrist_keys[position][CELL_CODES[player]] ^ self.zobrist_side_key
+        )
+        self.next_player = player
+        self.winner = winner
+        self.is_game_over = winner is not None
+        self.move_count -= 1
+        return (row, col)
 
-        # Step 1: check all rows to see if any player has won the game
-        for row in self.board:
-            if row.count(STRING_X) == self.size:
-                return STRING_X
-            if row.count(STRING_O) == self.size:
-                return STRING_O
-        # Step 2:then we check all columns to see if any player has won the game
-        for col in range(self.size):
-            if [self.board[row][col] for row in range(self.size)].count(
-                STRING_X
-            ) == self.size:
-                return STRING_X
-            if [self.board[row][col] for row in range(self.size)].count(
-                STRING_O
-            ) == self.size:
-                return STRING_O
-        # Step 3: then we check both diagonals to see if any player has won the game
-        if [self.board[i][i] for i in range(self.size)].count(STRING_X) == self.size:
-            return STRING_X
-        if [self.board[i][i] for i in range(self.size)].count(STRING_O) == self.size:
-            return STRING_O
+    def check_win(self):
+        # check if the game is over by scanning the whole board:
+        # a player wins by owning every cell of one of the winning lines
+        # (rows, columns and both diagonals, or shorter runs with a k-in-a-row rule),
+        # and a full board without a winner is a draw.
+        # make_move keeps self.winner up to date incrementally; this is the reference
+        for line in self.win_lines:
+            first_row, first_col = divmod(line[0], self.size)
+            first = self.board[first_row][first_col]
+            if first == STRING_EMPTY:
+                continue
+            if all(
+                self.board[cell // self.size][cell % self.size] == first
+                for cell in line
+            ):
+                return first
 
+        if self.move_count == self.size * self.size:
+            return STRING_WINNER_DRAW
         # if no player has won the game, return None
         return None
@@ -0,0 +1,20 @@
+import pytest
+from config import BOARD_INDEX_REACHABLE
+from model import TicTacToeModel
+from simulator import BatchSimulator, POLICY_RANDOM
+
+
+@pytest.fixture(scope="session")
+def index_cache_dir(tmp_path_factory):
+    """Index cache shared by the session's models, so tests never write into the checkout."""
+    return tmp_path_factory.mktemp("index_cache")
+
+
+@pytest.fixture(scope="session")
+def trained_model(index_cache_dir):
+    """Reachable-index model with the stats of 2,000 random games; tests must not modify it."""
+    model = TicTacToeModel(
+        board_index_mode=BOARD_INDEX_REACHABLE, index_cache_dir=index_cache_dir
+    )
+    BatchSimulator(model, seed=0).run(2_000, POLICY_RANDOM).apply_to(model)
+    return model
@@ -0,0 +1,54 @@
+import pytest
+from arena import (
+    run_arena,
+    make_agent,
+    wilson_interval,
+    AGENT_RANDOM,
+    AGENT_SOLVER,
+)
+
+
+def outcome_counts(report):
+    return tuple(report[key] for key in ("wins", "draws", "losses", "as_x", "as_o"))
+
+
+def test_solver_never_loses_to_random(trained_model):
+    solver = make_agent(AGENT_SOLVER, trained_model, seed=0)
+    report = run_arena(solver, make_agent(AGENT_RANDOM), 400, num_workers=1)
+    assert report["games"] == 400
+    assert report["losses"] == 0
+    assert report["wins"] + report["draws"] == 400
+    assert sum(report["as_x"]) == sum(report["as_o"]) == 200
+    assert report["win_interval"][0] <= report["win_rate"] <= report["win_interval"][1]
+    assert report["latency"]["a"]["moves"] > 0
+    assert report["latency"]["b"]["moves"] > 0
+
+
+def test_solvers_always_draw(trained_model):
+    solver = make_agent(AGENT_SOLVER, trained_model)
+    report = run_arena(solver, solver, 100, num_workers=1)
+    assert report["draws"] == 100
+
+
+def test_results_do_not_depend_on_worker_count():
+    reports = [
+        run_arena(
+            make_agent(AGENT_RANDOM),
+            make_agent(AGENT_RANDOM),
+            1_000,
+            num_workers=num_workers,
+            games_per_task=100,
+            seed=5,
+        )
+        for num_workers in (1, 2)
+    ]
+    assert outcome_counts(reports[0]) == outcome_counts(reports[1])
+
+
+def test_wilson_interval():
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    low, high = wilson_interval(0, 100)
+    assert low == 0.0 and 0.0 < high < 0.05
+    low, high = wilson_interval(50, 100)
+    assert low == pytest.approx(0.4038, abs=1e-4)
+    assert high == pytest.approx(0.5962, abs=1e-4)
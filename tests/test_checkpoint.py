@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from config import BOARD_INDEX_FULL, BOARD_INDEX_REACHABLE
+from model import TicTacToeModel
+from checkpoint import (
+    save_checkpoint,
+    load_checkpoint,
+    index_cache_path,
+    read_arrays,
+    check_header,
+    CHECKPOINT_KIND_STATS,
+)
+
+
+def test_stats_round_trip(tmp_path, trained_model, index_cache_dir):
+    path = tmp_path / "model.ckpt"
+    save_checkpoint(path, trained_model)
+    loaded = load_checkpoint(path, index_cache_dir=index_cache_dir)
+    assert loaded.boardIndexMode == BOARD_INDEX_REACHABLE
+    assert np.array_equal(loaded.stats, trained_model.stats)
+
+    # "c" maps copy-on-write: training on continues without touching the file
+    resumed = load_checkpoint(path, mmap_mode="c", index_cache_dir=index_cache_dir)
+    empty = resumed.getBoardIdForCode(3**9 - 1)
+    resumed.setMoveStatsFromBatch([empty], [4], [0], [0])
+    reloaded = load_checkpoint(path, index_cache_dir=index_cache_dir)
+    assert np.array_equal(reloaded.stats, trained_model.stats)
+
+
+def test_checkpoint_for_another_index_is_rejected(
+    tmp_path, trained_model, index_cache_dir
+):
+    path = tmp_path / "model.ckpt"
+    save_checkpoint(path, trained_model)
+    full_model = TicTacToeModel(
+        board_index_mode=BOARD_INDEX_FULL, index_cache_dir=index_cache_dir
+    )
+    with pytest.raises(ValueError):
+        load_checkpoint(path, full_model)
+
+
+def test_checkpoint_for_another_win_length_is_rejected(tmp_path, trained_model):
+    path = tmp_path / "model.ckpt"
+    save_checkpoint(path, trained_model)
+    header, _ = read_arrays(path)
+    assert header["win_length"] == 3
+    header["win_length"] = 2
+    with pytest.raises(ValueError):
+        check_header(header, trained_model, CHECKPOINT_KIND_STATS)
+
+
+def test_index_cache_round_trip(tmp_path):
+    built = TicTacToeModel(
+        board_index_mode=BOARD_INDEX_REACHABLE, index_cache_dir=tmp_path
+    )
+    assert (tmp_path / index_cache_path(built, tmp_path)).exists()
+    cached = TicTacToeModel(
+        board_index_mode=BOARD_INDEX_REACHABLE, index_cache_dir=tmp_path
+    )
+    assert np.array_equal(cached.id2code, built.id2code)
+    assert cached.board2id == built.board2id
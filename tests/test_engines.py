@@ -0,0 +1,89 @@
+import random
+import pytest
+from t3 import TicTacToe, WrongMoveError
+from bitboard import BitboardTicTacToe
+from zobrist import zobrist_hash_of_code
+
+
+def t3_state(game):
+    return (
+        [row[:] for row in game.board],
+        sorted(game.open_positions),
+        game.next_player,
+        game.winner,
+        game.is_game_over,
+        game.move_count,
+        game.board_code,
+        game.zobrist_hash,
+        [counts[:] for counts in game.line_counts],
+    )
+
+
+def bitboard_state(game):
+    return (
+        game.x_mask,
+        game.o_mask,
+        game.next_player,
+        game.winner,
+        game.is_game_over,
+        game.move_count,
+        game.board_code,
+        game.zobrist_hash,
+        list(game.history),
+    )
+
+
+@pytest.mark.parametrize("size, win_length", [(3, None), (4, 3), (6, 4)])
+def test_make_unmake_round_trip(size, win_length):
+    rng = random.Random(size)
+    for _ in range(50):
+        game = TicTacToe(size, win_length)
+        bitboard = BitboardTicTacToe(size, win_length=win_length)
+        snapshots = []
+        for _ in range(60):
+            if snapshots and (game.is_game_over or rng.random() < 0.3):
+                game.unmake_move()
+                bitboard.unmake_move()
+                expected, expected_bitboard = snapshots.pop()
+                assert t3_state(game) == expected
+                assert bitboard_state(bitboard) == expected_bitboard
+                continue
+            snapshots.append((t3_state(game), bitboard_state(bitboard)))
+            position = rng.choice(game.open_positions)
+            game.make_move(*divmod(position, size))
+            bitboard.make_move_at(position)
+            assert sorted(game.open_positions) == bitboard.open_positions
+            assert game.winner == bitboard.winner
+            assert game.zobrist_hash == bitboard.zobrist_hash
+            assert game.zobrist_hash == zobrist_hash_of_code(game.board_code, size)
+
+
+@pytest.mark.parametrize("size, win_length", [(3, None), (5, 4), (7, 5)])
+def test_incremental_winner_matches_full_scan(size, win_length):
+    rng = random.Random(size)
+    for _ in range(100):
+        game = TicTacToe(size, win_length)
+        while not game.is_game_over:
+            game.make_move(*divmod(rng.choice(game.open_positions), size))
+            assert game.winner == game.check_win()
+
+
+@pytest.mark.parametrize("engine", [TicTacToe, BitboardTicTacToe])
+def test_unmake_without_moves(engine):
+    with pytest.raises(WrongMoveError):
+        engine().unmake_move()
+
+
+def test_perft():
+    # number of distinct move sequences of 3x3 tic-tac-toe
+    def count_games(game):
+        if game.is_game_over:
+            return 1
+        total = 0
+        for position in list(game.open_positions):
+            game.make_move_at(position)
+            total += count_games(game)
+            game.unmake_move()
+        return total
+
+    assert count_games(BitboardTicTacToe(3)) == 255168
@@ -0,0 +1,88 @@
+import os
+import pytest
+from game_log import GameLogWriter, GameLogReader, FILE_HEADER_SIZE
+
+GAMES = [
+    ([4, 0, 8, 2, 6, 1], [0, 1, 0, 1, 0, 1], 1),
+    ([0, 3, 1, 4, 2], [0, 1, 0, 1, 0], 0),
+    ([4, 0, 2, 6, 3, 5, 1, 7, 8], [0, 1, 0, 1, 0, 1, 0, 1, 0], 2),
+]
+
+
+def read_games(path):
+    return [
+        (list(moves), list(players), outcome)
+        for moves, players, outcome in GameLogReader(path)
+    ]
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "games.log"
+    with GameLogWriter(path) as writer:
+        for game in GAMES:
+            writer.write_game(*game)
+    assert read_games(path) == GAMES
+
+
+def test_reopen_after_truncated_record(tmp_path):
+    path = tmp_path / "games.log"
+    with GameLogWriter(path) as writer:
+        writer.write_game(*GAMES[0])
+        writer.write_game(*GAMES[1])
+    # a crash in the middle of the second record
+    os.truncate(path, os.path.getsize(path) - 3)
+    assert read_games(path) == GAMES[:1]
+
+    with GameLogWriter(path) as writer:
+        writer.write_game(*GAMES[2])
+    assert read_games(path) == [GAMES[0], GAMES[2]]
+
+
+def test_reopen_after_truncated_header(tmp_path):
+    path = tmp_path / "games.log"
+    with GameLogWriter(path) as writer:
+        writer.write_game(*GAMES[0])
+    os.truncate(path, FILE_HEADER_SIZE - 3)
+    with pytest.raises(ValueError):
+        GameLogReader(path)
+
+    with GameLogWriter(path) as writer:
+        writer.write_game(*GAMES[1])
+    assert read_games(path) == GAMES[1:2]
+
+
+def test_reopen_rejects_other_files(tmp_path):
+    path = tmp_path / "games.log"
+    path.write_bytes(b"nope")
+    with pytest.raises(ValueError):
+        GameLogWriter(path)
+
+
+def test_large_board_round_trip(tmp_path, monkeypatch):
+    import game_log
+
+    monkeypatch.setattr(game_log, "TIC_TAC_TOE_SIZE", 12)
+    path = tmp_path / "games.log"
+    game = (list(range(144)), [move % 2 for move in range(144)], 2)
+    with GameLogWriter(path) as writer:
+        writer.write_game(*game)
+    assert read_games(path) == [game]
+    with pytest.raises(ValueError):
+        next(GameLogReader(path).iter_batches())
+
+    monkeypatch.setattr(game_log, "TIC_TAC_TOE_SIZE", 16)
+    with pytest.raises(ValueError):
+        GameLogWriter(tmp_path / "big.log")
+
+
+def test_replay_rejects_sparse_model(tmp_path):
+    from config import BOARD_INDEX_SPARSE
+    from model import TicTacToeModel
+    from game_log import replay_into_model
+
+    path = tmp_path / "games.log"
+    with GameLogWriter(path) as writer:
+        writer.write_game(*GAMES[0])
+    model = TicTacToeModel(board_index_mode=BOARD_INDEX_SPARSE, use_symmetry=False)
+    with pytest.raises(ValueError):
+        replay_into_model(path, model)
@@ -0,0 +1,33 @@
+import pytest
+from bitboard import BitboardTicTacToe
+from mcts import MCTSAgent
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"rollouts": 0, "time_budget_ms": None},
+        {"rollouts": None, "time_budget_ms": 0},
+        {"rollouts": None, "time_budget_ms": -5},
+    ],
+)
+def test_invalid_budget_is_rejected(options):
+    with pytest.raises(ValueError):
+        MCTSAgent(**options)
+
+
+def test_tiny_time_budget_still_moves():
+    agent = MCTSAgent(rollouts=None, time_budget_ms=1e-6, seed=0)
+    game = BitboardTicTacToe(3)
+    row, col = agent.choose_move(game)
+    assert agent.last_search["rollouts"] >= 1
+    assert 0 <= row < 3 and 0 <= col < 3
+
+
+def test_takes_an_immediate_win():
+    game = BitboardTicTacToe(3)
+    # X: (0, 0), (0, 1); O: (1, 0), (1, 1); X to move wins at (0, 2)
+    for move in [(0, 0), (1, 0), (0, 1), (1, 1)]:
+        game.make_move(*move)
+    agent = MCTSAgent(rollouts=2_000, time_budget_ms=None, seed=0)
+    assert agent.choose_move(game) == (0, 2)
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from config import BOARD_INDEX_REACHABLE, PLAYER_X
+from model import TicTacToeModel, TURN_INDEX, STAT_TRIES
+
+
+@pytest.fixture(scope="module")
+def reachable_model(index_cache_dir):
+    return TicTacToeModel(
+        board_index_mode=BOARD_INDEX_REACHABLE, index_cache_dir=index_cache_dir
+    )
+
+
+def test_unindexed_board_id_is_rejected(reachable_model):
+    model = reachable_model
+    # every cell X: not a reachable position
+    board_id = model.getBoardIdForCode(0)
+    assert board_id == -1
+    before = model.stats.copy()
+    for call in (
+        lambda: model.setMoveStatsForBoardId(board_id, 8, PLAYER_X, PLAYER_X),
+        lambda: model.setMoveStatsForEntireGameFromHistory(
+            [(board_id, 8, PLAYER_X)], PLAYER_X
+        ),
+        lambda: model.getStatsForBoardId(board_id, PLAYER_X),
+        lambda: model.getMoveScoresForBoardIds([board_id], [TURN_INDEX[PLAYER_X]]),
+        lambda: model.getStatsForBoardId(len(model.id2code), PLAYER_X),
+    ):
+        with pytest.raises(ValueError):
+            call()
+    assert np.array_equal(model.stats, before)
+
+
+def test_batch_weight(reachable_model):
+    model = reachable_model
+    empty = model.getBoardIdForCode(3**9 - 1)
+    before = model.stats[empty].copy()
+    model.setMoveStatsFromBatch([empty], [4], [0], [0], weight=3)
+    tries = model.getStatsForBoardId(empty, PLAYER_X)["tries"]
+    assert tries[4] - before[TURN_INDEX[PLAYER_X], STAT_TRIES, 4] == 3
+    for weight in (0.5, 0, -1, True):
+        with pytest.raises(ValueError):
+            model.setMoveStatsFromBatch([empty], [4], [0], [0], weight=weight)
@@ -0,0 +1,22 @@
+import numpy as np
+from config import BOARD_INDEX_REACHABLE
+from model import TicTacToeModel
+from policy import Policy, POLICY_SOFTMAX
+from simulator import BatchSimulator, POLICY_MODEL
+
+
+def test_refresh_changed_matches_full_recompile(trained_model, index_cache_dir):
+    model = TicTacToeModel(
+        board_index_mode=BOARD_INDEX_REACHABLE, index_cache_dir=index_cache_dir
+    )
+    model.stats[...] = trained_model.stats
+    policy = Policy(model, mode=POLICY_SOFTMAX, seed=0)
+    simulator = BatchSimulator(model, seed=1)
+    for _ in range(3):
+        simulator.run(200, POLICY_MODEL, epsilon=0.3).apply_to(model)
+        refreshed = policy.refresh_changed()
+        assert 0 < refreshed < len(policy.best_move)
+        compiled = Policy(model, mode=POLICY_SOFTMAX)
+        assert np.array_equal(policy.best_move, compiled.best_move)
+        assert np.array_equal(policy.cumulative_probs, compiled.cumulative_probs)
+    assert policy.refresh_changed() == 0
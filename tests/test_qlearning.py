@@ -0,0 +1,69 @@
+import numpy as np
+from board_geometry import CODE_EMPTY
+from model import OUTCOME_DRAW
+from qlearning import QLearner, linear_schedule
+from retrograde import RetrogradeSolver
+
+
+def test_lambda_one_learns_the_game_result(trained_model):
+    learner = QLearner(trained_model, seed=0)
+    batch = learner.simulator.run(1)
+    learner.update(batch, learning_rate=1.0, lam=1.0)
+    length = batch.lengths[0]
+    board_ids, moves, players = (
+        batch.board_ids[0, :length],
+        batch.moves[0, :length],
+        batch.players[0, :length],
+    )
+    # every move of the winner is worth +1, every move of the loser -1, a draw 0
+    expected = np.where(players == batch.winners[0], 1.0, -1.0)
+    if batch.winners[0] == OUTCOME_DRAW:
+        expected[...] = 0.0
+    assert np.array_equal(learner.q[board_ids, players, moves], expected)
+
+
+def test_lambda_zero_bootstraps_one_move_per_update(trained_model):
+    learner = QLearner(trained_model, seed=1)
+    batch = learner.simulator.run(1)
+    while batch.winners[0] == OUTCOME_DRAW:
+        batch = learner.simulator.run(1)
+    length = batch.lengths[0]
+    last = (batch.board_ids[0, length - 1], batch.players[0, length - 1])
+    before_last = (batch.board_ids[0, length - 2], batch.players[0, length - 2])
+    last_move, before_last_move = batch.moves[0, length - 1], batch.moves[0, length - 2]
+
+    learner.update(batch, learning_rate=1.0, lam=0.0)
+    assert learner.q[last][last_move] == 1.0
+    # the next board's values were still 0 when this move was updated
+    assert learner.q[before_last][before_last_move] == 0.0
+    learner.update(batch, learning_rate=1.0, lam=0.0)
+    # the opponent can now win from the next board
+    assert learner.q[before_last][before_last_move] == -1.0
+
+
+def test_training_approaches_perfect_play(trained_model):
+    learner = QLearner(trained_model, seed=0)
+    learner.train(
+        20_000,
+        learning_rate=linear_schedule(0.5, 0.1, 20_000),
+        epsilon=linear_schedule(0.3, 0.1, 20_000),
+    )
+    solver = RetrogradeSolver(trained_model)
+    model = trained_model
+    board_ids = np.nonzero(~model.boardTerminal & (model.sideToMove >= 0))[0]
+    turns = model.sideToMove[board_ids].astype(np.intp)
+    values = learner.getQValuesForBoardIds(board_ids, turns)
+    values = np.where(model.id2cells[board_ids] == CODE_EMPTY, values, -np.inf)
+    greedy = np.argmax(values, axis=1)
+    optimal = (solver.best_moves[board_ids].astype(np.int64) >> greedy) & 1
+    assert optimal.mean() > 0.95
+
+
+def test_q_table_round_trip(tmp_path, trained_model):
+    learner = QLearner(trained_model, seed=0)
+    learner.train(1_000)
+    path = tmp_path / "q.ckpt"
+    learner.save(path)
+    loaded = QLearner(trained_model)
+    loaded.load(path)
+    assert np.array_equal(loaded.q, learner.q)
@@ -0,0 +1,24 @@
+import sys
+import numpy as np
+import pytest
+from config import BOARD_INDEX_REACHABLE
+from model import TicTacToeModel
+from shared_stats import SharedStatsTable
+
+
+# attaching uses SharedMemory(track=False), new in Python 3.13
+@pytest.mark.skipif(sys.version_info < (3, 13), reason="needs Python 3.13")
+def test_shard_adds_are_visible_to_attached_readers(trained_model, index_cache_dir):
+    model = TicTacToeModel(
+        board_index_mode=BOARD_INDEX_REACHABLE, index_cache_dir=index_cache_dir
+    )
+    model.stats[...] = trained_model.stats
+    with SharedStatsTable.from_model(model, num_stripes=4) as table:
+        reader = SharedStatsTable.attach(table.name)
+        shard = np.zeros_like(model.stats)
+        shard[10, 0, 0, 4] = 5
+        table.add_shard(shard)
+        assert reader.array[10, 0, 0, 4] == trained_model.stats[10, 0, 0, 4] + 5
+        assert np.array_equal(model.stats, trained_model.stats + shard)
+        reader.close()
+        table.unbind(model)
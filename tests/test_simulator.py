@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from config import BOARD_INDEX_REACHABLE
+from board_geometry import CODE_EMPTY
+from model import TicTacToeModel
+from bitboard import BitboardTicTacToe
+from simulator import BatchSimulator, POLICY_RANDOM, POLICY_MODEL
+
+
+def replay(batch, size, win_length):
+    """Play every game of the batch on the bitboard engine; return the engine's winners."""
+    winners = []
+    for history, _ in batch.histories():
+        game = BitboardTicTacToe(size, win_length=win_length)
+        for _, move, player in history:
+            assert not game.is_game_over
+            assert game.next_player == player
+            game.make_move_at(move)
+        assert game.is_game_over
+        winners.append(game.winner)
+    return winners
+
+
+@pytest.mark.parametrize("size, win_length", [(3, None), (4, 3)])
+def test_random_games_follow_the_rules(size, win_length):
+    batch = BatchSimulator(size=size, seed=0, win_length=win_length).run(
+        500, POLICY_RANDOM
+    )
+    assert len(batch) == 500
+    expected = [who_won for _, who_won in batch.histories()]
+    assert replay(batch, size, win_length) == expected
+
+
+def test_model_policy_games_follow_the_rules(trained_model):
+    batch = BatchSimulator(trained_model, seed=0).run(500, POLICY_MODEL, epsilon=0.2)
+    expected = [who_won for _, who_won in batch.histories()]
+    assert replay(batch, 3, None) == expected
+    # recorded board ids are the model's ids of the positions before each move
+    board_ids, moves, _, _ = batch.rows()
+    assert np.all(trained_model.id2cells[board_ids, moves] == CODE_EMPTY)
+
+
+@pytest.mark.parametrize("policy", [POLICY_RANDOM, POLICY_MODEL])
+def test_transition_table_matches_line_checks(trained_model, index_cache_dir, policy):
+    model = TicTacToeModel(
+        board_index_mode=BOARD_INDEX_REACHABLE,
+        build_transitions=True,
+        index_cache_dir=index_cache_dir,
+    )
+    model.stats[...] = trained_model.stats
+    assert BatchSimulator(model).rules_match_model
+    # without a model the simulator places pieces and checks lines, on raw board codes
+    if policy == POLICY_MODEL:
+        raw_policy = lambda codes, turns: model.getMoveScoresForBoardIds(
+            model.code2id[codes], turns
+        )
+    else:
+        raw_policy = policy
+    fast = BatchSimulator(model, seed=3).run(2_000, policy, epsilon=0.2)
+    slow = BatchSimulator(seed=3).run(2_000, raw_policy, epsilon=0.2)
+    for name in ("moves", "players", "lengths", "winners"):
+        assert np.array_equal(getattr(fast, name), getattr(slow, name))
+    fast_ids, _, _, _ = fast.rows()
+    slow_codes, _, _, _ = slow.rows()
+    assert np.array_equal(fast_ids, model.code2id[slow_codes])
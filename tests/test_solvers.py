@@ -0,0 +1,19 @@
+import numpy as np
+from solver import PerfectSolver
+from retrograde import RetrogradeSolver
+
+
+def test_solver_round_trip(tmp_path, trained_model):
+    solver = PerfectSolver(trained_model)
+    path = tmp_path / "solved.ckpt"
+    solver.save(path)
+    loaded = PerfectSolver.load(path, trained_model)
+    assert np.array_equal(loaded.values, solver.values)
+    assert np.array_equal(loaded.best_moves, solver.best_moves)
+
+
+def test_retrograde_matches_negamax(trained_model):
+    negamax = PerfectSolver(trained_model)
+    retrograde = RetrogradeSolver(trained_model)
+    assert np.array_equal(negamax.values, retrograde.values)
+    assert np.array_equal(negamax.best_moves, retrograde.best_moves)
@@ -0,0 +1,89 @@
+import functools
+import numpy as np
+import pytest
+import model as model_module
+from config import BOARD_INDEX_HASHED, PLAYER_X
+from model import TicTacToeModel, STATS_DTYPE
+from sparse_stats import SparseStatsStore, EVICT_LRU, EVICT_LEAST_VISITED
+
+ENTRY_SHAPE = (2, 7, 9)
+
+
+def small_store(eviction, on_evict=None):
+    # room for a few hundred entries
+    return SparseStatsStore(
+        ENTRY_SHAPE,
+        STATS_DTYPE,
+        max_bytes=100 * 628,
+        eviction=eviction,
+        on_evict=on_evict,
+    )
+
+
+@pytest.mark.parametrize("eviction", [EVICT_LRU, EVICT_LEAST_VISITED])
+def test_eviction_frees_a_batch_and_keeps_hot_entries(eviction):
+    evicted = []
+    store = small_store(eviction, lambda slots, keys: evicted.append(keys))
+    capacity = store.capacity
+    for key in range(capacity):
+        store.entries[store.slot_for(key)] += 1
+    hot = 7
+    for _ in range(5):
+        store.slot_for(hot)
+    store.slot_for(capacity)
+
+    assert store.evictions == capacity // 16
+    assert len(store) == capacity - capacity // 16 + 1
+    assert hot in store and capacity in store
+    (keys,) = evicted
+    assert not any(key in store for key in keys.tolist())
+    if eviction == EVICT_LRU:
+        # the oldest writes go first
+        assert sorted(keys.tolist()) == list(range(len(keys)))
+    # evicted boards read as zeros, the others keep their stats
+    stats = store.gather(np.append(keys, hot))
+    assert stats[:-1].sum() == 0 and stats[-1].sum() > 0
+
+
+def test_lru_spares_recent_reads():
+    store = small_store(EVICT_LRU)
+    for key in range(store.capacity):
+        store.slot_for(key)
+    assert store.find(0) >= 0
+    store.slot_for(store.capacity)
+    assert 0 in store and 1 not in store
+
+
+def test_batch_larger_than_free_space():
+    store = small_store(EVICT_LRU)
+    for key in range(store.capacity):
+        store.slot_for(key)
+    batch = np.arange(10**6, 10**6 + store.capacity // 2)
+    slots = store.slots_for(batch)
+    assert all(key in store for key in batch.tolist())
+    assert len(set(slots.tolist())) == len(batch)
+
+
+def test_changed_board_ids_include_evicted_boards(monkeypatch):
+    monkeypatch.setattr(
+        model_module,
+        "SparseStatsStore",
+        functools.partial(SparseStatsStore, max_bytes=100 * 628),
+    )
+    model = TicTacToeModel(board_index_mode=BOARD_INDEX_HASHED, use_symmetry=False)
+    capacity = model.statsStore.capacity
+    start = model.statsGeneration
+    for board_hash in range(capacity + 10):
+        model.setMoveStatsForBoardId(board_hash, 0, PLAYER_X, PLAYER_X)
+    assert model.statsStore.evictions > 0
+    changed = model.getChangedBoardIdsSince(start)
+    assert changed.tolist() == list(range(capacity + 10))
+
+    # once more boards were evicted than the store holds, old generations cannot be served
+    for board_hash in range(capacity + 10, 3 * capacity):
+        model.setMoveStatsForBoardId(board_hash, 0, PLAYER_X, PLAYER_X)
+    with pytest.raises(ValueError):
+        model.getChangedBoardIdsSince(start)
+    recent = model.statsGeneration
+    model.setMoveStatsForBoardId(0, 0, PLAYER_X, PLAYER_X)
+    assert model.getChangedBoardIdsSince(recent).tolist() == [0]
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from config import BOARD_INDEX_REACHABLE
+from model import TicTacToeModel
+from simulator import POLICY_RANDOM, POLICY_MODEL
+from training import train_self_play
+
+
+@pytest.mark.parametrize("policy", [POLICY_RANDOM, POLICY_MODEL])
+def test_stats_do_not_depend_on_worker_count(index_cache_dir, policy):
+    stats = []
+    for num_workers in (1, 2):
+        model = TicTacToeModel(
+            board_index_mode=BOARD_INDEX_REACHABLE, index_cache_dir=index_cache_dir
+        )
+        result = train_self_play(
+            model,
+            4_000,
+            num_workers=num_workers,
+            games_per_task=500,
+            tasks_per_round=2,
+            policy=policy,
+            seed=7,
+        )
+        assert result["games"] == 4_000
+        stats.append(model.stats)
+    assert stats[0].any()
+    assert np.array_equal(stats[0], stats[1])
@@ -0,0 +1,171 @@
+"""
+Multiprocess self-play training.
+The driver splits the requested games into fixed-size tasks and hands them to a pool of
+worker processes. Each worker plays its tasks with the BatchSimulator into its own stats
+shard (an array shaped like TicTacToeModel.stats), and the driver merges the shards back
+into the master model after every round.
+
+With a SharedStatsTable, workers instead add each batch straight into the shared stats
+(under the table's stripe locks) and nothing is shipped back to the driver.
+
+Every task is seeded from its index, and merging is an integer sum, so the merged stats are
+identical to playing the same tasks serially (num_workers=1), whatever the worker count.
+"""
+
+import multiprocessing as mp
+import time
+import numpy as np
+from config import (
+    TRAINING_NUM_WORKERS,
+    TRAINING_GAMES_PER_TASK,
+    TRAINING_BATCH_SIZE,
+)
+from simulator import BatchSimulator, POLICY_RANDOM
+from shared_stats import SharedStatsTable
+from process_pool import pool_context
+
+# the model a worker plays with, and the shared table it writes to (if any);
+# set once per process by _init_worker
+_worker_model = None
+_worker_table = None
+
+
+def _init_worker(model, table_name=None, locks=None, table=None):
+    global _worker_model, _worker_table
+    _worker_model = model
+    # in-process runs pass the table itself; pool workers attach to it by name
+    _worker_table = table
+    if table_name is not None:
+        _worker_table = SharedStatsTable.attach(table_name, locks=locks)
+        _worker_table.bind(model)
+
+
+def _play_task(task):
+    """
+    Play one task into a fresh stats shard.
+    The worker's model is the policy snapshot; it is never written to.
+    With a shared table, each batch is added into the table instead and no shard is returned.
+
+    Args:
+        task: (task_index, num_games, seed, policy, epsilon, batch_size)
+    Returns:
+        (task_index, shard or None)
+    """
+    task_index, num_games, seed, policy, epsilon, batch_size = task
+    model = _worker_model
+    shard = np.zeros_like(model.stats)
+    simulator = BatchSimulator(model, seed=np.random.SeedSequence([seed, task_index]))
+    remaining = num_games
+    while remaining > 0:
+        batch = simulator.run(min(batch_size, remaining), policy, epsilon)
+        batch.apply_to(model, stats=shard)
+        remaining -= len(batch)
+        if _worker_table is not None:
+            _worker_table.add_shard(shard)
+            shard[...] = 0
+    if _worker_table is not None:
+        return task_index, None
+    return task_index, shard
+
+
+def train_self_play(
+    model,
+    num_games,
+    num_workers=TRAINING_NUM_WORKERS,
+    games_per_task=TRAINING_GAMES_PER_TASK,
+    tasks_per_round=None,
+    policy=POLICY_RANDOM,
+    epsilon=0.1,
+    seed=0,
+    batch_size=TRAINING_BATCH_SIZE,
+    on_round_end=None,
+    shared_table=None,
+):
+    """
+    Train the model's stats by self-play across worker processes.
+
+    Args:
+        model: TicTacToeModel to train (its stats are updated in place)
+        num_games: total games to play
+        num_workers: worker processes (None = one per CPU core, 1 = run in this process)
+        games_per_task: games per task (the unit of work and of seeding)
+        tasks_per_round: tasks between two merges into the master model
+            (None = one per worker). Workers play with the stats as of the start of the
+            round, so this also sets how often a POLICY_MODEL policy sees new stats.
+        policy: BatchSimulator policy (POLICY_RANDOM or POLICY_MODEL)
+        epsilon: exploration rate for POLICY_MODEL
+        seed: base seed; task i is seeded with (seed, i)
+        batch_size: games simulated in lockstep inside a task
+        on_round_end: optional callback(model, games_played) run after every merge
+        shared_table: optional SharedStatsTable bound to the model (see
+            SharedStatsTable.from_model). Workers then write into it in place instead of
+            returning shards. They also read their policy from the live table, so with
+            POLICY_MODEL the games depend on timing and are no longer reproducible.
+    Returns:
+        dictionary with "games", "seconds" and "games_per_sec"
+    """
+    if num_workers is None:
+        num_workers = mp.cpu_count()
+    if tasks_per_round is None:
+        tasks_per_round = num_workers
+
+    tasks = []
+    remaining = num_games
+    while remaining > 0:
+        task_games = min(games_per_task, remaining)
+        tasks.append((len(tasks), task_games, seed, policy, epsilon, batch_size))
+        remaining -= task_games
+
+    start = time.perf_counter()
+    games_played = 0
+    for round_start in range(0, len(tasks), tasks_per_round):
+        round_tasks = tasks[round_start : round_start + tasks_per_round]
+        if num_workers <= 1:
+            _init_worker(model, table=shared_table)
+            # play the whole round before merging, so every task sees the same snapshot
+            shards = [shard for _, shard in map(_play_task, round_tasks)]
+            for shard in shards:
+                if shard is not None:
+                    model.mergeStats(shard)
+        else:
+            if shared_table is not None:
+                initargs = (model, shared_table.name, shared_table.locks)
+            else:
+                initargs = (model,)
+            # a fresh pool per round, so workers fork from the freshly merged model
+            with pool_context().Pool(
+                num_workers, initializer=_init_worker, initargs=initargs
+            ) as pool:
+                for _, shard in pool.imap_unordered(_play_task, round_tasks):
+                    if shard is not None:
+                        model.mergeStats(shard)
+        if shared_table is not None:
+            # workers wrote straight into the shared stats; the driver cannot tell which rows
+            model.markStatsChanged()
+        games_played += sum(task[1] for task in round_tasks)
+        if on_round_end is not None:
+            on_round_end(model, games_played)
+
+    seconds = time.perf_counter() - start
+    return {
+        "games": games_played,
+        "seconds": seconds,
+        "games_per_sec": games_played / seconds if seconds > 0 else float("inf"),
+    }
+
+
+if __name__ == "__main__":
+    from config import CHECKPOINT_PATH
+    from model import TicTacToeModel
+    from checkpoint import CheckpointWriter
+
+    model = TicTacToeModel()
+    checkpoints = CheckpointWriter(CHECKPOINT_PATH)
+    summary = train_self_play(
+        model, num_games=1_000_000, on_round_end=checkpoints.maybe_save
+    )
+    checkpoints.save(model, summary["games"])
+    print(
+        f"Played {summary['games']} games in {summary['seconds']:.2f}s "
+        f"({summary['games_per_sec']:.0f} games/sec), saved to {CHECKPOINT_PATH}"
+    )
@@ -0,0 +1,92 @@
+"""
+Zobrist hashing of boards.
+
+Every (cell, player) pair gets a fixed random key, and so does the side to move; the hash
+of a position is the XOR of the keys of its occupied cells, plus the side key when O is to
+move. The empty board hashes to 0, and a move changes the hash by two XORs (its cell key and
+the side key), so the game engines keep it up to date in O(1) (t3.TicTacToe.zobrist_hash,
+bitboard.BitboardTicTacToe.zobrist_hash). Keys come from a fixed seed, so hashes are stable
+across runs and processes and can be stored.
+
+Different positions can share a hash; with 63-bit keys that is vanishingly rare, and
+CollisionChecker (ZOBRIST_CHECK_COLLISIONS for the model's hashed index) verifies it.
+
+Keys have 63 random bits (the sign bit is clear), so hashes fit the signed 64-bit integer
+arrays used for board ids everywhere else.
+"""
+
+from functools import lru_cache
+import numpy as np
+from config import TIC_TAC_TOE_SIZE
+from board_geometry import code_weights, CODE_X, CODE_O
+
+ZOBRIST_SEED = 0x7A0B
+HASH_BITS = 63
+
+
+def zobrist_keys(size=TIC_TAC_TOE_SIZE):
+    """
+    Random key of every (cell, player).
+
+    Returns:
+        tuple with one (key for X, key for O) pair of Python ints per cell
+    """
+    return _random_keys(size)[0]
+
+
+def zobrist_side_key(size=TIC_TAC_TOE_SIZE):
+    """Key XORed into the hash while O is to move."""
+    return _random_keys(size)[1]
+
+
+@lru_cache(maxsize=None)
+def _random_keys(size):
+    rng = np.random.default_rng([ZOBRIST_SEED, size])
+    keys = rng.integers(0, 1 << HASH_BITS, size=size * size * 2 + 1, dtype=np.int64)
+    cell_keys = tuple(
+        (int(keys[2 * cell]), int(keys[2 * cell + 1])) for cell in range(size * size)
+    )
+    return cell_keys, int(keys[-1])
+
+
+def zobrist_hash_of_cells(cells, size=TIC_TAC_TOE_SIZE):
+    """
+    Hash of a board given as a sequence of cell codes (X=0, O=1, _=2). X moves first, so
+    O is to move when X has more pieces.
+    """
+    keys = zobrist_keys(size)
+    board_hash = 0
+    pieces = 0
+    for cell, code in enumerate(cells):
+        if code == CODE_X or code == CODE_O:
+            board_hash ^= keys[cell][code]
+            pieces += 1 if code == CODE_X else -1
+    if pieces > 0:
+        board_hash ^= zobrist_side_key(size)
+    return board_hash
+
+
+def zobrist_hash_of_code(code, size=TIC_TAC_TOE_SIZE):
+    """Hash of a board given as its base-3 code (see board_geometry.code_weights)."""
+    return zobrist_hash_of_cells(
+        [code // weight % 3 for weight in code_weights(size)], size
+    )
+
+
+class CollisionChecker:
+    """
+    Verification mode for hash-keyed tables: remembers the board code behind every hash it
+    is shown and raises ValueError when a hash turns up for a second, different board.
+    Keeps one dict item per distinct board, so it is meant for test runs, not production.
+    """
+
+    def __init__(self):
+        self.codes = {}
+
+    def check(self, board_hash, code):
+        """Record that board_hash belongs to the board with this base-3 code."""
+        known = self.codes.setdefault(board_hash, code)
+        if known != code:
+            raise ValueError(
+                f"Zobrist collision: boards {known} and {code} both hash to {board_hash}"
+            )